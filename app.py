@@ -1,23 +1,21 @@
 # -------------------------- Importing Required Libraries -----------------------------
+# Only light modules are imported here; heavy backends (Whisper, Chroma, LangChain agents, PDF) are
+# imported inside the feature that needs them, once per process (Python caches them in sys.modules)
 import os  # File system and environment variable management
-import re  # Regular expressions for cleaning text (e.g., removing emojis)
 import uuid  # Generate unique IDs (not used directly here)
+import time  # Poll background job status
 import streamlit as st  # Streamlit library for web app UI
 import urllib.parse  # Encode URL query parameters for sharing
 from dotenv import load_dotenv  # Load environment variables from .env file
-import yt_dlp  # Library for downloading YouTube videos
-from bs4 import BeautifulSoup  # Clean HTML from summaries
-from fpdf import FPDF  # Generate PDF files from text
-from transcriber import transcribe_video  # Custom transcription function
-from summarizer import summarize_text_with_toc_2000  # Summarization function with TOC
-from splitter import split_text  # Utility to split transcript into smaller parts
-from vector_store import store_chunks_persistent  # Store transcript chunks into vector DB
-from langchain_openai import ChatOpenAI  # OpenAI interface for LangChain
+from transcriber import join_segments  # Join timestamped segments into a transcript
+from transcript_cache import load_transcript, youtube_cache_key  # Persistent transcript cache
+from media_store import ingest_upload  # Deduplicated upload storage with a disk quota
+from jobs import submit_job, get_job, cancel_job, latest_result, start_workers, DONE, FINISHED  # Background job queue
+from clients import get_chat_model  # Shared ChatOpenAI models (reused across reruns)
+from llm_cache import cached_invoke  # Cached LLM calls (Streamlit reruns repeat them constantly)
 from utils import extract_video_id  # Extracts video ID from YouTube URLs
-from moviepy.video.io.VideoFileClip import VideoFileClip  # Retrieve video duration
-import moviepy.editor as mp  # General video handling
-from qa_agent import build_agent, set_transcript  # Custom Q&A agent tools
-from langsmith import traceable  # Tool for tracing LangChain runs
+from text_normalizer import clean_summary  # Strip the table of contents for display and export
+from metrics import span, start_metrics_server  # Stage timing and the /metrics endpoint
 
 
 
@@ -25,6 +23,8 @@ from langsmith import traceable  # Tool for tracing LangChain runs
 os.environ["PATH"] += os.pathsep + r"C:\Users\HUAWEI\Downloads\ffmpeg-7.1.1-essentials_build\ffmpeg\ffmpeg-7.1.1-essentials_build\bin\ffmpeg.exe"  # Add FFmpeg path to environment
 load_dotenv()  # Load .env variables
 openai_api_key = os.getenv("OPENAI_API_KEY")  # Fetch OpenAI API key
+start_workers()  # Background workers for download, transcription, summary and translation (once per process)
+start_metrics_server()  # Prometheus-style /metrics on METRICS_PORT (once per process)
 
 # ---------------------- Streamlit App Configuration -------------------------
 st.set_page_config(page_title="🎮 Video Analyzer", layout="wide")  # Configure page title and layout
@@ -34,139 +34,44 @@ st.markdown('<div style="font-size:16px; color:gray;">Summarize, translate, and
 
 
 # ---------------------- Session State Initialization -------------------------
-for key in ["video_path", "transcript", "summary", "raw_summary", "chat_history", "show_quiz", "keywords"]:
+for key in ["video_path", "transcript", "summary", "raw_summary", "chat_history", "show_quiz", "keywords",
+            "cache_key", "segments", "video_duration", "source_url", "media_url", "summary_job", "translation_job", "upload_id",
+            "transcribe_failure"]:
     if key not in st.session_state:
         st.session_state[key] = None
 
-# ---------------------- Emoji and Symbol Cleaning Function -------------------------
-def clean_text_for_pdf(text):
-    emoji_pattern = re.compile("["
-        "\U0001F600-\U0001F64F"
-        "\U0001F300-\U0001F5FF"
-        "\U0001F680-\U0001F6FF"
-        "\U0001F1E0-\U0001F1FF"
-        "\U00002500-\U00002BEF"
-        "\U00002702-\U000027B0"
-        "\U00002702-\U000027B0"
-        "\U000024C2-\U0001F251"
-        "\U0001f926-\U0001f937"
-        "\U00010000-\U0010ffff"
-        "\u2640-\u2642"
-        "\u2600-\u2B55"
-        "\u200d"
-        "\u23cf"
-        "\u23e9"
-        "\u231a"
-        "\ufe0f"
-        "\u3030"
-        "]", flags=re.UNICODE)
-
-    clean_text = emoji_pattern.sub(r'', text)
-
-    symbol_replacements = {
-        "📋": "[Table of Contents]",
-        "✅": "[Done]",
-        "🌍": "[Globe]",
-        "📌": "[Pin]",
-        "🌐": "[Translate]",
-        "🔍": "[Search]",
-        "📄": "[Document]",
-        "📝": "[Notes]",
-        "📁": "[Folder]",
-        "💬": "[Chat]",
-        "🔗": "[Link]",
-        "⚠️": "[Warning]",
-        "🔄": "[Refresh]",
-        "🤖": "[Bot]",
-        "🎮": "[Game]",
-        "🎬": "[Film]",
-        "📂": "[Folder]",
-        "❌": "[Error]"
-    }
-    for symbol, replacement in symbol_replacements.items():
-        clean_text = clean_text.replace(symbol, replacement)
-
-    clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-
-    return clean_text
-
-# ---------------------- Summary Cleaner: Removes Icons & Structure ----------------------
-def extract_and_clean_summary(summary_html):
-    soup = BeautifulSoup(summary_html, "html.parser")
-    text = soup.get_text(separator="\n")
-    lines = text.splitlines()
-    cleaned_lines = []
-    toc_mode = False
-
-    for line in lines:
-        if "📋" in line or "Table of Contents" in line:
-            toc_mode = True
-            continue
-        if toc_mode:
-            if line.strip().startswith("✅") or line.strip() == "":
-                continue
+# ---------------------- Store a (cached or fresh) transcription in the session ----------------------
+def apply_transcription(entry):
+    st.session_state.segments = entry["segments"]
+    st.session_state.video_duration = entry["duration"]
+    st.session_state.transcript = join_segments(entry["segments"])
+
+# ---------------------- Poll a background job until it finishes ----------------------
+# Reruns interrupt the polling, not the job: the next run polls the same job again
+def wait_for_job(job_id, label, partial_as_text=False):
+    if st.button("✖️ Cancel", key=f"cancel_{job_id}"):
+        cancel_job(job_id)
+
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    partial_view = st.empty()
+    while True:
+        job = get_job(job_id)
+        if job is None or job["status"] in FINISHED:
+            break
+        progress_bar.progress(min(1.0, job["progress"]))
+        status_text.text(job["message"] or label)
+        if job["partial"]:
+            if partial_as_text:
+                partial_view.text(job["partial"])
             else:
-                toc_mode = False
-        cleaned_lines.append(line)
-    return "\n".join(cleaned_lines)
-
-# ---------------------- YouTube Downloader using yt_dlp ----------------------
-def download_youtube_video(url, output_path="downloads/"):
-    os.makedirs(output_path, exist_ok=True)
-
-    PROXY_URL = os.getenv("PROXY_URL")
-    if not PROXY_URL:
-        st.error("❌ Missing PROXY_URL environment variable.")
-        return None
-
-    
-    ydl_opts = {
-        'format': 'mp4',
-        'outtmpl': os.path.join(output_path, '%(id)s.%(ext)s'),
-        'quiet': True,
-        'ignoreerrors': True,
-        'proxy': PROXY_URL
-    }
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            return os.path.join(output_path, f"{info['id']}.mp4")
-    except Exception as e:
-        st.error(f"Failed to download video: {str(e)}")
-        return None
-
-# ---------------------- PDF Generator from Cleaned Text ----------------------
-def create_pdf(text, filename):
-    try:
-        class PDF(FPDF):
-            def header(self):
-                self.set_font('Arial', 'B', 12)
-                self.cell(0, 10, 'Video Summary Report', 0, 1, 'C')
-                self.ln(10)
-
-            def footer(self):
-                self.set_y(-15)
-                self.set_font('Arial', 'I', 8)
-                self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
-
-        pdf = PDF()
-        pdf.add_page()
-
-        try:
-            pdf.add_font('ArialUnicode', '', 'arial-unicode-ms.ttf', uni=True)
-            pdf.set_font('ArialUnicode', '', 12)
-        except:
-            pdf.add_font('DejaVu', '', 'DejaVuSansCondensed.ttf', uni=True)
-            pdf.set_font('DejaVu', '', 12)
-
-        clean_text = clean_text_for_pdf(text)
-        pdf.multi_cell(0, 10, clean_text)
-        pdf.output(filename)
-        return True
-
-    except Exception as e:
-        st.error(f"Failed to create PDF: {str(e)}")
-        return False
+                partial_view.markdown(job["partial"])
+        time.sleep(0.5)
+
+    progress_bar.empty()
+    status_text.empty()
+    partial_view.empty()
+    return job
 
 # ----------------------------------- Streamlit Tabs -----------------------------------
 tab1, tab2, tab3 = st.tabs(["Upload & Summarize", "💬 Chatbot", "🔗 Share"])
@@ -185,13 +90,18 @@ with tab1:
         file = st.file_uploader("Upload video/audio", type=["mp4", "mp3", "mkv", "webm", "m4a"])
         if file:
             try:
-                os.makedirs("uploads", exist_ok=True)
-                path = os.path.join("uploads", file.name)
-                with open(path, "wb") as f:
-                    f.write(file.getbuffer())
-                st.session_state.video_path = path
-                st.session_state.retriever = None
-                st.session_state.qa_tool = None
+                # Written to disk (in chunks, hashed on the way) once per upload, not on every rerun
+                upload_id = getattr(file, "file_id", None) or f"{file.name}:{file.size}"
+                if st.session_state.upload_id != upload_id:
+                    path, cache_key = ingest_upload(file)  # Identical media is stored once and shares one cached transcript
+                    st.session_state.upload_id = upload_id
+                    if st.session_state.cache_key != cache_key:
+                        st.session_state.video_path = path  # Audio is demuxed by the background transcription job
+                        st.session_state.cache_key = cache_key
+                        st.session_state.source_url = None
+                        st.session_state.transcript = None
+                        st.session_state.retriever = None
+                        st.session_state.qa_tool = None
                 st.success("File uploaded successfully!")
             except Exception as e:
                 st.error(f"Upload failed: {str(e)}")
@@ -228,26 +138,63 @@ with tab1:
                 )
 
 
-                with st.spinner("Downloading video..."):
-                    path = download_youtube_video(url)
-                    if path:
-                        st.session_state.video_path = path
-                        st.session_state.retriever = None
-                        st.session_state.qa_tool = None
-                        st.markdown('<div style="color: #28a745; font-size: 14px;"> Video downloaded successfully!</div>', unsafe_allow_html=True)
+                cache_key = youtube_cache_key(vid)
+                if st.session_state.cache_key != cache_key:
+                    st.session_state.transcript = None
+                    st.session_state.video_path = None
+                    st.session_state.media_url = None
+                    st.session_state.upload_id = None  # Re-selecting the upload later switches back to it
+                    st.session_state.source_url = f"https://www.youtube.com/watch?v={vid}"  # Chapter links seek into this video
+                    st.session_state.retriever = None
+                    st.session_state.qa_tool = None
+
+                    # A cached transcript makes the download unnecessary
+                    cached = load_transcript(cache_key)
+                    if cached:
+                        st.session_state.cache_key = cache_key
+                        apply_transcription(cached)
+                        st.markdown('<div style="color: #28a745; font-size: 14px;"> Transcript loaded from cache!</div>', unsafe_allow_html=True)
+                    else:
+                        # Downloaded by the background transcription job
+                        st.session_state.cache_key = cache_key
+                        st.session_state.media_url = st.session_state.source_url  # Canonical URL: every session pasting this video joins one job
 
             else:
                 st.error("❌ Invalid YouTube link. Please enter a valid URL.")
 
-    # Transcribe video if not already done
-    if st.session_state.video_path and st.session_state.transcript is None:
-        with st.spinner("Transcribing video content..."):
-            try:
-                st.session_state.transcript = transcribe_video(st.session_state.video_path)
-                st.markdown('<div style="color: #28a745; font-size: 14px;"> Transcription completed!</div>', unsafe_allow_html=True)
-
-            except Exception as e:
-                st.error(f"Transcription failed: {str(e)}")
+    # A failed or cancelled transcription is not submitted again until the user explicitly retries it
+    failure = st.session_state.transcribe_failure
+    failed = failure is not None and failure["key"] == st.session_state.cache_key
+    if failed and st.session_state.transcript is None:
+        st.error(f"Transcription failed: {failure['error']}")
+        if st.button("🔁 Transcribe again"):
+            st.session_state.transcribe_failure = None
+            st.rerun()
+
+    # Transcribe video if not already done (download first for links)
+    elif (st.session_state.video_path or st.session_state.media_url) and st.session_state.transcript is None:
+        params = {"cache_key": st.session_state.cache_key}
+        if st.session_state.video_path:
+            params["video_path"] = st.session_state.video_path
+        else:
+            params["url"] = st.session_state.media_url
+        job = wait_for_job(submit_job("transcribe", st.session_state.cache_key, params), "Transcribing video content...", partial_as_text=True)
+
+        entry = load_transcript(st.session_state.cache_key) if job and job["status"] == DONE else None
+        if entry:
+            apply_transcription(entry)
+            st.session_state.video_path = job["result"]["video_path"]
+            st.session_state.media_url = None
+            st.markdown('<div style="color: #28a745; font-size: 14px;"> Transcription completed!</div>', unsafe_allow_html=True)
+        else:
+            if job and job["status"] == DONE:
+                # Finished, but the transcript was evicted from the cache before this session could load it
+                error = "the transcript expired from the cache before it could be loaded; transcribe again to regenerate it"
+            else:
+                error = job["error"] if job and job["error"] else "cancelled"
+            # Remembered per video: reruns (the link is still in the text box) must not start a new job
+            st.session_state.transcribe_failure = {"key": st.session_state.cache_key, "error": error}
+            st.rerun()  # Show the error with its retry button
 
     # Display transcript and allow summarization
     if st.session_state.transcript:
@@ -258,25 +205,29 @@ with tab1:
         topic = st.selectbox("Summary Type", ["Detailed Summary", "Medium Summary", "Short Summary"])
 
         if st.button("🔍 Generate Summary", type="primary"):
-            with st.spinner("Generating summary..."):
-                try:
-                    limited_text = st.session_state.transcript[:4000]
-                    video_clip = mp.VideoFileClip(st.session_state.video_path)
-                    duration_minutes = video_clip.duration / 60
-
-                    summary_text = summarize_text_with_toc_2000(
-                        text=limited_text,
-                        api_key=openai_api_key,
-                        language=language,
-                        topic=topic,
-                        video_duration_min=duration_minutes
-                    )
-                    st.session_state.summary = summary_text
-                    st.session_state.raw_summary = extract_and_clean_summary(summary_text)
-                    st.markdown('<div style="color: #28a745; font-size: 14px;">✅ Summary generated successfully!</div>', unsafe_allow_html=True)
-
-                except Exception as e:
-                    st.error(f"Summary generation failed: {str(e)}")
+            # Full transcript with real chapter timestamps, summarized by a background worker
+            params = {
+                "cache_key": st.session_state.cache_key,
+                "language": language,
+                "topic": topic,
+                "source_url": st.session_state.source_url,
+            }
+            previous = latest_result("summarize", st.session_state.cache_key, params)  # Same summary made by any session
+            if previous:
+                st.session_state.summary = previous["summary"]
+                st.session_state.raw_summary = clean_summary(st.session_state.summary)
+            else:
+                st.session_state.summary_job = submit_job("summarize", st.session_state.cache_key, params)
+
+        if st.session_state.summary_job:
+            job = wait_for_job(st.session_state.summary_job, "Generating summary...")
+            st.session_state.summary_job = None
+            if job and job["status"] == DONE:
+                st.session_state.summary = job["result"]["summary"]
+                st.session_state.raw_summary = clean_summary(st.session_state.summary)
+                st.markdown('<div style="color: #28a745; font-size: 14px;">✅ Summary generated successfully!</div>', unsafe_allow_html=True)
+            else:
+                st.error(f"Summary generation failed: {job['error'] if job and job['error'] else 'cancelled'}")
 
     # Display summary and allow download
     if st.session_state.summary:
@@ -288,20 +239,21 @@ with tab1:
         # Two-column layout for download buttons
         col1, col2 = st.columns(2)
         with col1:
-            pdf_path = "video_summary.pdf"
             if st.button("📥 Generate PDF Summary"):
                 with st.spinner("Creating PDF file..."):
-                    if create_pdf(st.session_state.raw_summary, pdf_path):
-                        with open(pdf_path, "rb") as f:
-                            st.download_button(
-                                label="⬇️ Download PDF",
-                                data=f,
-                                file_name=pdf_path,
-                                mime="application/pdf",
-                                key="pdf_download"
-                            )
+                    from pdf_utils import render_pdf  # PDF export (fpdf)
+                    try:
+                        pdf_bytes = render_pdf(st.session_state.raw_summary)  # In memory; cached per summary
+                    except Exception as e:
+                        st.error(f"Failed to generate PDF file: {e}")
                     else:
-                        st.error("Failed to generate PDF file")
+                        st.download_button(
+                            label="⬇️ Download PDF",
+                            data=pdf_bytes,
+                            file_name="video_summary.pdf",
+                            mime="application/pdf",
+                            key="pdf_download"
+                        )
         with col2:
             st.download_button(
                 label="📝 Download Text Summary",
@@ -316,52 +268,29 @@ with tab1:
         translate_source = st.radio("Content to translate:", ["Summary", "Transcript"], horizontal=True)
 
         if st.button("🌐 Translate", type="primary"):
-            with st.spinner("Translating content..."):
-                try:
-                    source_text = st.session_state.raw_summary if translate_source == "Summary" else st.session_state.transcript
-                    paragraphs = [source_text[i:i+2000] for i in range(0, len(source_text), 2000)]
-                    llm = ChatOpenAI(
-                        temperature=0,
-                        model="gpt-3.5-turbo",
-                        openai_api_key=openai_api_key,
-                        streaming=True
-                    )
-
-                    st.markdown(f'<div style="font-size:16px; font-weight:600;">📘 {selected_lang} Translation</div>', unsafe_allow_html=True)
-                    translation_placeholder = st.empty()
-                    streamed_translation = ""
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-
-                    for i, para in enumerate(paragraphs):
-                        status_text.text(f"Translating part {i+1}/{len(paragraphs)}...")
-                        progress_bar.progress((i + 1) / len(paragraphs))
-
-                        streamed_chunk = ""
-                        prompt = (
-                            f"Translate the following text to {selected_lang} "
-                            f"while preserving all formatting and structure:\n\n{para}"
-                        )
-
-                        for chunk in llm.stream(prompt):
-                            streamed_chunk += chunk.content or ""
-                            translation_placeholder.markdown( streamed_translation + streamed_chunk
-    )
-
-                        streamed_translation += streamed_chunk + "\n\n"
-
-                    status_text.markdown('<div style="color: #28a745; font-size: 14px;">✅ Translation completed!</div>', unsafe_allow_html=True)
-                    progress_bar.empty()
-
-                    st.download_button(
-                        "📥 Download Translation",
-                        streamed_translation.strip(),
-                        file_name=f"translation_{selected_lang}.txt",
-                        mime="text/plain"
-                    )
-
-                except Exception as e:
-                    st.error(f"Translation failed: {str(e)}")
+            source_text = st.session_state.raw_summary if translate_source == "Summary" else st.session_state.transcript
+            st.session_state.translation_job = submit_job("translate", st.session_state.cache_key, {
+                "text": source_text,
+                "language": selected_lang,
+            })
+
+        if st.session_state.translation_job:
+            job = wait_for_job(st.session_state.translation_job, "Translating content...")
+            st.session_state.translation_job = None
+            if job and job["status"] == DONE:
+                translated_lang = job["params"]["language"]
+                st.markdown(f'<div style="font-size:16px; font-weight:600;">📘 {translated_lang} Translation</div>', unsafe_allow_html=True)
+                st.markdown(job["result"]["translation"])
+                st.markdown('<div style="color: #28a745; font-size: 14px;">✅ Translation completed!</div>', unsafe_allow_html=True)
+
+                st.download_button(
+                    "📥 Download Translation",
+                    job["result"]["translation"],
+                    file_name=f"translation_{translated_lang}.txt",
+                    mime="text/plain"
+                )
+            else:
+                st.error(f"Translation failed: {job['error'] if job and job['error'] else 'cancelled'}")
 # Tab 2: Interactive Chatbot
 # Tab 2: Interactive Chatbot + Dynamic Quiz
 with tab2:
@@ -372,11 +301,21 @@ with tab2:
     if not st.session_state.transcript:
         st.warning("🔄 Please upload and transcribe a video first.")
     else:
-        # Set global transcript for the agent
-        set_transcript(st.session_state.transcript)
+        from qa_agent import get_agent  # Custom Q&A agent tools (LangChain agents)
+
+        # Embed the transcript chunks once per video; later questions only run a top-k search
+        if st.session_state.get("retriever") is None:
+            with st.spinner("Indexing transcript..."):
+                from splitter import split_text  # Utility to split transcript into smaller parts
+                from vector_store import store_chunks_persistent  # Store transcript chunks into vector DB (Chroma)
+                st.session_state.retriever = store_chunks_persistent(
+                    split_text(st.session_state.transcript),
+                    openai_api_key,
+                    content_key=st.session_state.cache_key  # One collection per video, shared by identical media
+                )
 
-        # Build the agent (QA model)
-        agent = build_agent(openai_api_key)
+        # Agent for this session's video, built once and reused on every rerun
+        agent = get_agent(openai_api_key, st.session_state.retriever, st.session_state.cache_key)
 
         # Initialize chat history if not present
         if st.session_state.chat_history is None:
@@ -389,18 +328,18 @@ with tab2:
         if question:
             with st.spinner("🤖 Thinking..."):
                 try:
-                    transcript = st.session_state.transcript
+                    # The agent's VideoQA tool retrieves the chunks relevant to this question (covers the whole video),
+                    # so the prompt carries only the question and the excerpts reach the model once
                     prompt = f"""
-                    Answer the following question based ONLY on the transcript content.
-                    Transcript:
-                    {transcript[:2000]}
+                    Answer the following question based ONLY on the transcript excerpts returned by the VideoQA tool.
 
                     Question:
                     {question}
 
                     If the question is unrelated to the transcript, say: 'This question is outside the scope of the video.'
                     """
-                    answer = agent.run(prompt)
+                    with span("qa", model="gpt-4"):
+                        answer = agent.run(prompt)
                     chat_history.append(("User", question))
                     chat_history.append(("Agent", answer))
                     st.session_state.chat_history = chat_history
@@ -428,11 +367,7 @@ with tab2:
                     source_text = st.session_state.raw_summary or st.session_state.transcript[:3000]
 
                     # Use LLM to generate multiple-choice questions
-                    llm = ChatOpenAI(
-                        temperature=0,
-                        model="gpt-3.5-turbo",
-                        openai_api_key=openai_api_key
-                    )
+                    llm = get_chat_model(openai_api_key, model="gpt-3.5-turbo", temperature=0)
 
                     prompt = f"""
                     Based on the following content, generate 5 multiple choice comprehension questions with 4 options each (A, B, C, D) 
@@ -451,8 +386,8 @@ with tab2:
                     {source_text}
                     """
 
-                    response = llm.invoke(prompt)
-                    st.session_state.dynamic_quiz = eval(response.content)  # NOTE: use json.loads if safer
+                    response = cached_invoke(llm, prompt, "quiz-v1")
+                    st.session_state.dynamic_quiz = eval(response)  # NOTE: use json.loads if safer
 
                 except Exception as e:
                     st.error(f"Failed to generate quiz: {e}")
@@ -528,16 +463,12 @@ if st.session_state.get("raw_summary"):
     if "keywords" not in st.session_state:
         with st.spinner("Extracting keywords..."):
             def extract_keywords(text, api_key, language="English"):
-                llm = ChatOpenAI(
-                    temperature=0.3,
-                    model="gpt-3.5-turbo",
-                    openai_api_key=api_key
-                )
+                llm = get_chat_model(api_key, model="gpt-3.5-turbo", temperature=0.3)
                 prompt = (
                     f"Extract 10-15 concise and important keywords or phrases from the following summary in {language}. "
                     f"Return them as a comma-separated list:\n\n{text[:2000]}"
                 )
-                return llm.invoke(prompt).content
+                return cached_invoke(llm, prompt, "keywords-v1")
 
             st.session_state.keywords = extract_keywords(
                 st.session_state.raw_summary, openai_api_key, language="English"
@@ -0,0 +1,182 @@
+# audio_utils.py
+
+import hashlib  # Single-flight key for URLs without a video ID
+import json  # Parse ffprobe output
+import os  # File paths
+import queue  # Bounded buffer between the streaming decoder and the transcriber
+import shutil  # Remove temporary download directories
+import subprocess  # Run ffmpeg / ffprobe
+import sys  # Run the installed yt_dlp as a subprocess
+import tempfile  # Private download directories; subprocess error output without risking a full pipe
+import threading  # Read the decoder output while the transcriber is busy
+import numpy as np  # Streamed audio is handed out as float32 sample arrays
+import yt_dlp  # Library for downloading YouTube media
+from metrics import span  # Stage timing
+from media_store import DOWNLOAD_DIR, enforce_quota, touch  # Size-bounded LRU over downloads/ and uploads/
+from single_flight import single_flight  # One download per video across sessions and workers
+from utils import extract_video_id  # Video ID (and output file name) before downloading
+
+SAMPLING_RATE = 16000  # Whisper consumes 16 kHz mono audio
+
+# Streaming ingest settings
+STREAM_CHUNK_SECONDS = float(os.getenv("STREAM_CHUNK_SECONDS", "5"))  # Audio per streamed chunk
+STREAM_BUFFER_CHUNKS = int(os.getenv("STREAM_BUFFER_CHUNKS", "60"))  # Chunks buffered before the download is paused
+
+
+# Demux the audio stream of any media file and resample it once to 16 kHz mono PCM WAV
+def extract_audio(input_path, output_path=None):
+    output_path = output_path or os.path.splitext(input_path)[0] + ".wav"
+    with span("extract_audio") as current:
+        subprocess.run(
+            [
+                "ffmpeg", "-nostdin", "-y", "-loglevel", "error",
+                "-i", input_path,
+                "-vn",  # Skip the video stream entirely (no video decoding)
+                "-ac", "1",  # Mono
+                "-ar", str(SAMPLING_RATE),  # 16 kHz
+                "-c:a", "pcm_s16le",
+                output_path,
+            ],
+            check=True,
+        )
+        current.add(bytes=os.path.getsize(input_path))
+    return output_path
+
+
+# Read the media duration (seconds) from container metadata without decoding anything
+def probe_duration(path):
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", path],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return float(json.loads(result.stdout)["format"]["duration"])
+
+
+# Download only the audio track of a YouTube video and convert it to 16 kHz mono WAV
+# 'progress_hook' is passed to yt_dlp and called with its download status dicts
+# Concurrent calls for the same video (other sessions, workers or batch runs) share one download: the first
+# one downloads while the others wait, calling 'on_wait' meanwhile, and then reuse its downloads/<id>.wav
+def download_youtube_audio(url, output_path=DOWNLOAD_DIR, proxy=None, progress_hook=None, on_wait=None):
+    os.makedirs(output_path, exist_ok=True)
+    video_id = extract_video_id(url)
+    audio_path = os.path.join(output_path, f"{video_id}.wav") if video_id else None
+
+    # The WAV only appears once complete (atomic rename), so an existing file is always usable
+    def lookup():
+        return audio_path if audio_path and touch(audio_path) else None  # Reuse counts as use for the media quota
+
+    if lookup():
+        return audio_path
+    key = f"download-{video_id or hashlib.sha256(url.encode('utf-8')).hexdigest()}"
+    return single_flight(key, lookup, lambda: _download_audio(url, output_path, proxy, progress_hook), on_wait)
+
+
+# Download into a private temporary directory and move the finished WAV into place in one step
+def _download_audio(url, output_path, proxy, progress_hook):
+    work_dir = tempfile.mkdtemp(prefix=".partial-", dir=output_path)
+    try:
+        ydl_opts = {
+            'format': 'bestaudio/best',  # Audio-only stream (falls back to a muxed file if none exists)
+            'outtmpl': os.path.join(work_dir, '%(id)s.%(ext)s'),
+            'quiet': True,
+            'proxy': proxy,
+            'progress_hooks': [progress_hook] if progress_hook else [],
+        }
+        with span("download") as current, yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=True)
+            source_path = ydl.prepare_filename(info)
+            current.add(bytes=os.path.getsize(source_path), audio_seconds=info.get("duration") or 0)
+
+        # Keep only the 16 kHz WAV that Whisper consumes
+        audio_path = os.path.join(output_path, f"{info['id']}.wav")
+        os.replace(extract_audio(source_path, os.path.join(work_dir, "audio.wav")), audio_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)  # The original download and any partial files
+    enforce_quota()  # Make room by evicting least recently used media
+    return audio_path
+
+
+# Download a YouTube video's audio through the proxy configured in PROXY_URL
+def download_youtube_video(url, output_path=DOWNLOAD_DIR, progress_hook=None, on_wait=None):
+    proxy = os.getenv("PROXY_URL")
+    if not proxy:
+        raise ValueError("❌ Missing PROXY_URL environment variable.")
+    return download_youtube_audio(url, output_path, proxy=proxy, progress_hook=progress_hook, on_wait=on_wait)
+
+
+# Stream a YouTube video's audio as 16 kHz mono float32 chunks while it downloads, without writing a file
+# yt_dlp pipes the audio stream into ffmpeg; a reader thread fills a bounded queue, so when the consumer
+# falls behind, the pipes fill up and ffmpeg and the download pause (backpressure) instead of buffering the video
+def stream_youtube_audio(url, proxy=None, chunk_seconds=STREAM_CHUNK_SECONDS, max_buffered_chunks=STREAM_BUFFER_CHUNKS):
+    errors = tempfile.TemporaryFile()
+    download = subprocess.Popen(
+        [
+            sys.executable, "-m", "yt_dlp", "--quiet", "--no-warnings",
+            "-f", "bestaudio/best",  # Audio-only stream (falls back to a muxed file if none exists)
+            *(["--proxy", proxy] if proxy else []),
+            "-o", "-",  # Write the media to stdout
+            url,
+        ],
+        stdout=subprocess.PIPE,
+        stderr=errors,
+    )
+    decode = subprocess.Popen(
+        [
+            "ffmpeg", "-loglevel", "error",
+            "-i", "pipe:0",
+            "-vn",
+            "-ac", "1",
+            "-ar", str(SAMPLING_RATE),
+            "-f", "s16le",  # Raw samples, no container
+            "pipe:1",
+        ],
+        stdin=download.stdout,
+        stdout=subprocess.PIPE,
+        stderr=errors,
+    )
+    download.stdout.close()  # ffmpeg owns the read end now
+
+    chunks = queue.Queue(maxsize=max_buffered_chunks)
+    chunk_bytes = int(chunk_seconds * SAMPLING_RATE) * 2  # 16-bit samples
+
+    def read():
+        try:
+            for data in iter(lambda: decode.stdout.read(chunk_bytes), b""):
+                chunks.put(data)  # Blocks while the buffer is full
+        finally:
+            chunks.put(None)
+
+    reader = threading.Thread(target=read, daemon=True, name="audio-stream-reader")
+    reader.start()
+    try:
+        for data in iter(chunks.get, None):
+            yield np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+
+        if download.wait() or decode.wait():
+            errors.seek(0)
+            message = errors.read().decode("utf-8", "replace").strip()
+            raise RuntimeError(f"❌ Audio stream failed: {message or 'yt_dlp/ffmpeg exited with an error'}")
+    finally:
+        # Stop both processes if the consumer gave up early, then unblock the reader thread
+        for process in (download, decode):
+            if process.poll() is None:
+                process.kill()
+        while reader.is_alive():
+            try:
+                chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        download.wait()
+        decode.wait()
+        decode.stdout.close()
+        errors.close()
+
+
+# Stream a YouTube video's audio through the proxy configured in PROXY_URL
+def stream_youtube_video(url):
+    proxy = os.getenv("PROXY_URL")
+    if not proxy:
+        raise ValueError("❌ Missing PROXY_URL environment variable.")
+    return stream_youtube_audio(url, proxy=proxy)
@@ -0,0 +1,231 @@
+# batch.py
+# Headless batch summarizer: python batch.py URL_OR_FILE [...] --output-dir summaries/
+
+import argparse  # Command-line interface
+import json  # Checkpoints and JSON output
+import os  # Paths and environment variables
+import queue  # Segments passed from the transcription to the summarizer
+import re  # Channel URLs
+import threading  # Per-stage concurrency limits
+import traceback  # Report failures without stopping the batch
+from concurrent.futures import ThreadPoolExecutor, as_completed  # One pipeline per input, run concurrently
+from dotenv import load_dotenv  # Load environment variables from .env file
+import yt_dlp  # Expand playlists into video URLs
+import transcriber  # Whisper model pool settings
+from transcriber import join_segments  # Join timestamped segments into a transcript
+from audio_utils import download_youtube_video, extract_audio, probe_duration  # Audio-only ingest
+from transcript_cache import get_or_transcribe, load_transcript, file_cache_key, youtube_cache_key  # Cached transcription
+from summarizer import summarize_text_with_toc_2000  # Summarization function with TOC
+from pdf_utils import extract_and_clean_summary, create_pdf  # Summary cleaning and PDF export
+from utils import extract_video_id  # Extracts video ID from YouTube URLs
+from metrics import start_metrics_server  # /metrics endpoint while the batch runs
+
+
+# Video IDs of a playlist/channel listing; nested listings (e.g. channel tabs) are expanded as well
+def _listing_video_ids(ydl, url, depth=0):
+    info = ydl.extract_info(url, download=False)
+    ids = []
+    for entry in info.get("entries") or []:
+        nested = entry.get("_type") == "playlist" or (entry.get("_type") == "url" and entry.get("ie_key") == "YoutubeTab")
+        if nested and depth < 2:
+            ids.extend(_listing_video_ids(ydl, entry.get("url") or entry.get("webpage_url"), depth + 1))
+        elif not nested and entry.get("id"):
+            ids.append(entry["id"])
+    return ids
+
+
+# Turn command-line inputs into a flat list of YouTube URLs and local files (playlists are expanded)
+def expand_inputs(inputs):
+    items = []
+    for source in inputs:
+        if os.path.exists(source):
+            items.append(source)
+        elif "list=" in source or "/playlist" in source or "/@" in source or "/channel/" in source:
+            # A channel root lists its tabs (Videos, Shorts, Live), not videos; take its uploads
+            if re.search(r"/(@[^/?#]+|channel/[^/?#]+)/?(?:[?#].*)?$", source):
+                source = re.sub(r"/?(?=[?#]|$)", "/videos", source, count=1)
+            with yt_dlp.YoutubeDL({"quiet": True, "extract_flat": True, "proxy": os.getenv("PROXY_URL")}) as ydl:
+                items.extend(f"https://www.youtube.com/watch?v={video_id}" for video_id in _listing_video_ids(ydl, source))
+        else:
+            items.append(source)
+    return list(dict.fromkeys(items))  # Drop duplicates, keep order
+
+
+# Checkpoint of finished stages for one input, so a crashed batch resumes where it stopped
+class Checkpoint:
+    def __init__(self, directory):
+        self.path = os.path.join(directory, "checkpoint.json")
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+
+    def get(self, name):
+        return self.state.get(name)
+
+    def set(self, name, value):
+        self.state[name] = value
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(self.path + ".tmp", self.path)
+
+
+# Transcribe and summarize at the same time: segments flow from the transcriber into the summarizer through a
+# queue, and each chapter is summarized as soon as its part of the audio is decoded
+# Returns (transcript entry, summary); the summary is None if no segments were streamed (another process
+# finished the transcription first), and the caller then summarizes the cached transcript as usual
+def transcribe_and_summarize(cache_key, audio_path, args, stage_limits, source_url):
+    segments = queue.Queue()
+    received = []
+
+    def transcribe():
+        try:
+            with stage_limits["transcribe"]:
+                return get_or_transcribe(cache_key, audio_path, on_segment=segments.put)
+        finally:
+            segments.put(None)  # End of the stream, also when the transcription fails
+
+    def stream():
+        for segment in iter(segments.get, None):
+            received.append(segment)
+            yield segment
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        transcription = executor.submit(transcribe)
+        summary = summarize_text_with_toc_2000(
+            text="",
+            api_key=os.getenv("OPENAI_API_KEY"),
+            language=args.language,
+            topic=args.topic,
+            segments=stream(),
+            duration=probe_duration(audio_path),  # Chapter boundaries before the transcript exists
+            source_url=source_url,
+            chapter_slot=stage_limits["llm"],  # An LLM slot only while a chapter is being summarized
+        )
+        entry = transcription.result()  # Raises if the transcription failed (the partial summary is dropped)
+    return entry, summary if received else None
+
+
+# Download -> transcribe -> summarize -> write outputs for one input; each stage waits for a free slot
+def process_item(source, args, stage_limits):
+    video_id = None if os.path.exists(source) else extract_video_id(source)
+    if not video_id and not os.path.exists(source):
+        raise ValueError(f"Not a file or a YouTube video URL: {source}")
+    cache_key = youtube_cache_key(video_id) if video_id else file_cache_key(source)
+
+    output_dir = os.path.join(args.output_dir, cache_key)
+    checkpoint = Checkpoint(output_dir)
+    if checkpoint.get("outputs"):
+        return output_dir  # Finished in an earlier run
+
+    source_url = f"https://www.youtube.com/watch?v={video_id}" if video_id else None
+    summary = checkpoint.get("summary")
+
+    # Videos already transcribed (by the web app or an earlier batch) skip download and transcription
+    entry = load_transcript(cache_key)
+    if entry is None:
+        # Stage 1: fetch or demux audio (into the output directory; the input's own folder is left untouched)
+        audio_path = checkpoint.get("audio_path")
+        if not audio_path or not os.path.exists(audio_path):
+            with stage_limits["download"]:
+                if video_id:
+                    audio_path = download_youtube_video(source)
+                elif source.lower().endswith(".wav"):
+                    audio_path = source  # Already audio; Whisper decodes it directly
+                else:
+                    audio_path = extract_audio(source, os.path.join(output_dir, "audio.wav"))
+            checkpoint.set("audio_path", audio_path)
+
+        # Stage 2: transcription (the transcript cache is the checkpoint)
+        # Without a summary checkpoint, stage 3 runs alongside it, chapter by chapter
+        if summary is None:
+            entry, summary = transcribe_and_summarize(cache_key, audio_path, args, stage_limits, source_url)
+        else:
+            with stage_limits["transcribe"]:
+                entry = get_or_transcribe(cache_key, audio_path)
+
+    # Stage 3: LLM summary (unless it was made during the transcription)
+    if summary is None:
+        with stage_limits["llm"]:
+            summary = summarize_text_with_toc_2000(
+                text=join_segments(entry["segments"]),
+                api_key=os.getenv("OPENAI_API_KEY"),
+                language=args.language,
+                topic=args.topic,
+                segments=entry["segments"],
+                source_url=source_url,
+            )
+    checkpoint.set("summary", summary)
+
+    # Outputs
+    raw_summary = extract_and_clean_summary(summary)
+    outputs = []
+    if "json" in args.formats:
+        path = os.path.join(output_dir, "summary.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"source": source, "cache_key": cache_key, "duration": entry["duration"],
+                       "summary": summary, "segments": entry["segments"]}, f, ensure_ascii=False, indent=2)
+        outputs.append(path)
+    if "txt" in args.formats:
+        path = os.path.join(output_dir, "summary.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(raw_summary)
+        outputs.append(path)
+    if "pdf" in args.formats:
+        path = os.path.join(output_dir, "summary.pdf")
+        if create_pdf(raw_summary, path):
+            outputs.append(path)
+    checkpoint.set("outputs", outputs)
+    return output_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize many videos, files or whole playlists without the web UI.")
+    parser.add_argument("inputs", nargs="*", help="YouTube URLs, playlist/channel URLs or local media files")
+    parser.add_argument("--input-file", help="Text file with one input per line")
+    parser.add_argument("--output-dir", default="summaries")
+    parser.add_argument("--language", default="Arabic")
+    parser.add_argument("--topic", default="Detailed Summary", choices=["Detailed Summary", "Medium Summary", "Short Summary"])
+    parser.add_argument("--formats", default="json,txt,pdf", help="Comma-separated: json, txt, pdf")
+    parser.add_argument("--download-workers", type=int, default=4)
+    parser.add_argument("--transcribe-workers", type=int, default=max(1, (os.cpu_count() or 2) // 4))
+    parser.add_argument("--llm-workers", type=int, default=4)
+    args = parser.parse_args(argv)
+    args.formats = set(args.formats.split(","))
+
+    load_dotenv()
+    start_metrics_server()
+    inputs = list(args.inputs)
+    if args.input_file:
+        with open(args.input_file, "r", encoding="utf-8") as f:
+            inputs.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    items = expand_inputs(inputs)
+
+    # One Whisper model per concurrent transcription
+    transcriber.POOL_SIZE = max(transcriber.POOL_SIZE, args.transcribe_workers)
+    stage_limits = {
+        "download": threading.Semaphore(args.download_workers),
+        "transcribe": threading.Semaphore(args.transcribe_workers),
+        "llm": threading.Semaphore(args.llm_workers),
+    }
+
+    # Enough threads for every stage to be busy at once; the semaphores keep each stage within its limit
+    max_threads = args.download_workers + args.transcribe_workers + args.llm_workers
+    failures = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_threads)) as executor:
+        futures = {executor.submit(process_item, item, args, stage_limits): item for item in items}
+        for future in as_completed(futures):
+            try:
+                print(f"✅ {futures[future]} -> {future.result()}")
+            except Exception:
+                failures += 1
+                print(f"❌ {futures[future]}\n{traceback.format_exc()}")
+
+    print(f"Done: {len(items) - failures} succeeded, {failures} failed.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,427 @@
+# benchmarks/bench.py
+# Benchmark suite: python benchmarks/bench.py [--case NAME ...] [--save-baseline] [--fail-on-regression]
+# Every case runs in its own process (clean peak RSS) against a local fake OpenAI server and a fake yt_dlp
+
+import argparse  # Command-line interface
+import json  # Results and baselines
+import math  # Percentile rank
+import os  # Paths and environment variables
+import platform  # Environment recorded with baselines
+import random  # Deterministic text fixtures
+import resource  # Peak RSS of a case process
+import shutil  # Temporary directories
+import subprocess  # Fixture generation and case processes
+import sys  # Interpreter and module path
+import tempfile  # Isolated caches per case
+import time  # Timers
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FIXTURE_DIR = os.path.join(BENCH_DIR, ".fixtures")  # Generated audio (git-ignored)
+FAKE_YT_DLP_DIR = os.path.join(BENCH_DIR, "fake_yt_dlp")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baselines.json")
+REGRESSION_THRESHOLD = 0.2  # p50 latency or peak RSS more than 20% above the baseline is a regression
+
+AUDIO_LENGTHS = (30, 120, 600)  # Seconds of fixture audio for transcribe_video
+# Modules app.py imports at start-up, then the heavy ones it defers to first use
+IMPORT_PROFILE_MODULES = (
+    "streamlit", "transcriber", "transcript_cache", "jobs", "clients", "llm_cache", "metrics", "utils",
+    "text_normalizer", "media_store", "single_flight",
+    "pdf_utils", "splitter", "vector_store", "qa_agent", "summarizer", "faster_whisper",
+)
+SAMPLING_RATE = 16000
+WORDS = (
+    "the model video summary chapter transcript audio speech data network market history science "
+    "energy climate city education health language music research student teacher lecture "
+    "الفيديو الملخص البيانات التعليم الصحة المدينة الطاقة البحث الطالب المحاضرة"
+).split()
+
+
+# ---------------------- Measurement helpers ----------------------
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]  # Nearest rank
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KiB on Linux
+
+
+# Call 'func' 'warmup' + 'repeat' times; 'units' is the work per call (chars, audio seconds, chunks...)
+def measure(func, repeat, warmup=1, units=1, unit="calls"):
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    total = sum(timings)
+    return {
+        "calls": repeat,
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "throughput": units * repeat / total if total else 0.0,
+        "unit": f"{unit}/s",
+    }
+
+
+# ---------------------- Fixtures ----------------------
+
+# Pink-noise WAV of 'seconds' (or BENCH_SPEECH_AUDIO looped to that length, for realistic decoding)
+def audio_fixture(seconds, extension="wav"):
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    speech = os.getenv("BENCH_SPEECH_AUDIO")
+    path = os.path.join(FIXTURE_DIR, f"{'speech' if speech else 'noise'}-{seconds}s.{extension}")
+    if not os.path.exists(path):
+        source = ["-stream_loop", "-1", "-i", speech] if speech else ["-f", "lavfi", "-i", f"anoisesrc=c=pink:a=0.1:d={seconds}"]
+        codec = ["-c:a", "pcm_s16le"] if extension == "wav" else ["-c:a", "aac", "-b:a", "64k", "-movflags", "+faststart"]
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-y", "-loglevel", "error", *source, "-t", str(seconds),
+             "-ac", "1", "-ar", str(SAMPLING_RATE), *codec, path],
+            check=True,
+        )
+    return path
+
+
+# Deterministic transcript-like text of 'words' words
+def transcript_fixture(words):
+    rng = random.Random(0)
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 20))
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + ".")
+        words -= length
+    return " ".join(sentences)
+
+
+# Whisper-style segments (12 words, 4 seconds each) for a transcript
+def segments_fixture(text):
+    words = text.split()
+    return [
+        {"start": i / 3, "end": i / 3 + 4, "text": " ".join(words[i:i + 12])}
+        for i in range(0, len(words), 12)
+    ]
+
+
+# A summary as rendered by summarizer.summarize_text_with_toc_2000 and shown in the app
+def summary_fixture(chapters=5):
+    toc = "📋 **Table of Contents**\n\n" + "".join(f"✅ Chapter {i + 1}: Chapter title {i + 1} ([{i:02d}:00])\n" for i in range(chapters))
+    body = "".join(
+        f"[{i:02d}:00]\n📌 **Chapter title {i + 1}**\n{transcript_fixture(250)} 🔍 🌍\n\n" for i in range(chapters)
+    )
+    return f"<div style='direction: rtl'>{toc}\n---\n\n{body}</div>"
+
+
+# ---------------------- Cases ----------------------
+# Each case runs inside its own process and returns measure()'s result
+
+CASES = {}
+
+
+def case(name):
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+def _transcribe_case(seconds):
+    def run():
+        from transcriber import transcribe_video
+        path = audio_fixture(seconds)
+        transcribe_video(audio_fixture(5))  # Load the model outside the measurement
+        return measure(lambda: transcribe_video(path), repeat=1 if seconds >= 600 else 3, warmup=0,
+                       units=seconds, unit="audio_s")
+    return run
+
+
+for _seconds in AUDIO_LENGTHS:
+    case(f"transcribe_video[{_seconds}s]")(_transcribe_case(_seconds))
+
+
+@case("split_text")
+def split_text_case():
+    from splitter import split_text
+    text = transcript_fixture(40000)
+    return measure(lambda: split_text(text), repeat=20, units=len(text), unit="chars")
+
+
+@case("split_text_for_summary")
+def split_text_for_summary_case():
+    from summarizer import split_text_for_summary
+    text = transcript_fixture(40000)
+    return measure(lambda: split_text_for_summary(text), repeat=200, units=len(text), unit="chars")
+
+
+@case("clean_text_for_pdf")
+def clean_text_for_pdf_case():
+    from pdf_utils import clean_text_for_pdf
+    text = summary_fixture()
+    return measure(lambda: clean_text_for_pdf(text), repeat=200, units=len(text), unit="chars")
+
+
+@case("extract_and_clean_summary")
+def extract_and_clean_summary_case():
+    from pdf_utils import extract_and_clean_summary
+    text = summary_fixture()
+    return measure(lambda: extract_and_clean_summary(text), repeat=200, units=len(text), unit="chars")
+
+
+@case("create_pdf")
+def create_pdf_case():
+    from pdf_utils import create_pdf, extract_and_clean_summary
+    text = extract_and_clean_summary(summary_fixture())
+    path = os.path.join(tempfile.mkdtemp(), "summary.pdf")
+    runs = iter(range(1000))
+
+    def run():
+        # A different text per call, so every call renders instead of hitting the PDF cache
+        if not create_pdf(f"{text}\n{next(runs)}", path):
+            raise RuntimeError("create_pdf failed (is a Unicode font available? see PDF_FONT_PATH)")
+
+    return measure(run, repeat=10)
+
+
+@case("render_pdf[cached]")
+def render_pdf_cached_case():
+    from pdf_utils import extract_and_clean_summary, render_pdf
+    text = extract_and_clean_summary(summary_fixture())
+    return measure(lambda: render_pdf(text), repeat=200)  # The warm-up call renders, the rest are cache hits
+
+
+def _index_case(backend):
+    def run():
+        os.environ["VECTOR_BACKEND"] = backend  # Read when vector_store is imported
+        import vector_store
+        from splitter import split_text
+        vector_store.PERSIST_DIRECTORY = tempfile.mkdtemp()
+        vector_store.REGISTRY_PATH = os.path.join(vector_store.PERSIST_DIRECTORY, "collections_lru.json")
+        chunks = split_text(transcript_fixture(60000))
+        runs = iter(range(1000))
+        # A new content key per call, so every call embeds and writes all chunks
+        return measure(
+            lambda: vector_store.store_chunks_persistent(chunks, os.getenv("OPENAI_API_KEY"), content_key=f"bench-{next(runs)}"),
+            repeat=3, units=len(chunks), unit="chunks",
+        )
+    return run
+
+
+case("index[chroma]")(_index_case("chroma"))
+case("index[matrix]")(_index_case("matrix"))
+
+
+@case("summarize")
+def summarize_case():
+    from summarizer import summarize_text_with_toc_2000
+    text = transcript_fixture(20000)
+    segments = segments_fixture(text)
+    return measure(
+        lambda: summarize_text_with_toc_2000(text, os.getenv("OPENAI_API_KEY"), language="English",
+                                             segments=segments, source_url="https://www.youtube.com/watch?v=benchmark01"),
+        repeat=3, units=len(text.split()), unit="words",
+    )
+
+
+# Link -> audio -> transcript -> summary -> PDF, through the same functions the app and batch CLI use
+def _end_to_end_case(streaming):
+    def run():
+        os.environ["FAKE_YTDLP_SOURCE"] = audio_fixture(120, extension="m4a")  # Read when the fake yt_dlp is imported
+        import transcript_cache
+        from audio_utils import download_youtube_video, stream_youtube_video
+        from pdf_utils import create_pdf, extract_and_clean_summary
+        from summarizer import summarize_text_with_toc_2000
+        from transcriber import join_segments
+
+        runs = iter(range(1000))
+        output_dir = tempfile.mkdtemp()
+
+        def pipeline():
+            url = f"https://www.youtube.com/watch?v=bench{next(runs):06d}"
+            key = f"bench-{url[-11:]}"  # New key per call: nothing is served from the transcript cache
+            if streaming:
+                entry = transcript_cache.get_or_transcribe_stream(key, lambda: stream_youtube_video(url))
+            else:
+                entry = transcript_cache.get_or_transcribe(key, download_youtube_video(url, output_dir))
+            summary = summarize_text_with_toc_2000(join_segments(entry["segments"]), os.getenv("OPENAI_API_KEY"),
+                                                   language="English", segments=entry["segments"], source_url=url)
+            create_pdf(extract_and_clean_summary(summary), os.path.join(output_dir, "summary.pdf"))
+
+        return measure(pipeline, repeat=2, warmup=1)
+    return run
+
+
+case("end_to_end[download]")(_end_to_end_case(streaming=False))
+case("end_to_end[stream]")(_end_to_end_case(streaming=True))
+
+
+# Cold start: import Streamlit and render the app's first page once in a fresh process
+@case("app_first_render")
+def app_first_render_case():
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(os.path.join(REPO_DIR, "app.py"), default_timeout=120)
+    app.run()
+    elapsed = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return {"calls": 1, "p50_ms": elapsed * 1000, "p99_ms": elapsed * 1000, "throughput": 1 / elapsed, "unit": "renders/s"}
+
+
+# ---------------------- Runner ----------------------
+
+# Environment of a case process: fake services, throwaway caches, no metrics server
+def case_environment(base_url, scratch, args):
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": base_url,  # openai client
+        "OPENAI_API_BASE": base_url,  # LangChain
+        "PROXY_URL": "http://proxy.invalid",  # Required by the download helpers; the fake yt_dlp ignores it
+        "FAKE_YTDLP_BYTES_PER_SECOND": str(args.download_bytes_per_second),
+        "PYTHONPATH": os.pathsep.join([FAKE_YT_DLP_DIR, REPO_DIR, env.get("PYTHONPATH", "")]),
+        "LLM_CACHE_BACKEND": "none",
+        "TRANSCRIPT_CACHE_DIR": os.path.join(scratch, "transcripts"),
+        "MATRIX_INDEX_DIR": os.path.join(scratch, "vectors"),
+        "JOBS_DB_PATH": os.path.join(scratch, "jobs.sqlite"),
+        "UPLOAD_DIR": os.path.join(scratch, "uploads"),  # The media quota only ever evicts scratch files
+        "DOWNLOAD_DIR": os.path.join(scratch, "downloads"),
+        "SINGLE_FLIGHT_DIR": os.path.join(scratch, "locks"),
+        "METRICS_PORT": "0",
+        "METRICS_LOG": "none",
+    })
+    return env
+
+
+def run_case(name, env):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        result_path = f.name
+    try:
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run-case", name, "--result-file", result_path],
+            cwd=REPO_DIR, env=env, capture_output=True, text=True,
+        )
+        with open(result_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        if process.returncode or not content:
+            return {"error": (process.stderr or process.stdout).strip().splitlines()[-1:] or ["failed"]}
+        return json.loads(content)
+    finally:
+        os.remove(result_path)
+
+
+# Cumulative import time (ms) of each module in a fresh interpreter, from 'python -X importtime'
+def import_profile(modules, env):
+    profile = {}
+    for module in modules:
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                 cwd=REPO_DIR, env=env, capture_output=True, text=True)
+        profile[module] = None  # Not importable here
+        if process.returncode:
+            continue
+        for line in process.stderr.splitlines():
+            fields = [field.strip() for field in line.split("|")]
+            if len(fields) == 3 and fields[2] == module:  # The module's own line (cumulative includes its imports)
+                profile[module] = int(fields[1]) / 1000
+    return profile
+
+
+def compare(name, result, baselines):
+    baseline = baselines.get("results", {}).get(name)
+    if not baseline:
+        return "no baseline", False
+    if "error" in result or "error" in baseline:
+        return "", False
+    change = result["p50_ms"] / baseline["p50_ms"] - 1 if baseline["p50_ms"] else 0.0
+    rss_change = result["peak_rss_mb"] / baseline["peak_rss_mb"] - 1 if baseline["peak_rss_mb"] else 0.0
+    regressed = change > REGRESSION_THRESHOLD or rss_change > REGRESSION_THRESHOLD
+    return f"{change:+.0%} p50, {rss_change:+.0%} rss{' REGRESSION' if regressed else ''}", regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the transcription, text, PDF, indexing and summary paths.")
+    parser.add_argument("--case", action="append", help=f"Case to run (repeatable); default all: {', '.join(CASES)}")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds the fake OpenAI API adds to each request")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0, help="Fake completion pacing (0 = instant)")
+    parser.add_argument("--download-bytes-per-second", type=float, default=2 * 1024 * 1024, help="Fake download speed")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Store the results in {os.path.relpath(BASELINE_PATH, REPO_DIR)}")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 when a case regressed")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)  # Internal: run one case in this process
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        result = CASES[args.run_case]()
+        result["peak_rss_mb"] = peak_rss_mb()
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return 0
+
+    from fake_openai import start_fake_openai  # Same directory as this script
+    server, base_url = start_fake_openai(latency=args.llm_latency, tokens_per_second=args.llm_tokens_per_second)
+
+    try:
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+    except (OSError, ValueError):
+        baselines = {}
+    if not baselines and not args.save_baseline:
+        # Baselines are machine-specific and not shipped; without one the run only reports numbers
+        print(f"No baseline at {os.path.relpath(BASELINE_PATH, REPO_DIR)}: regression check skipped "
+              f"(record one on this machine with --save-baseline).\n")
+
+    scratch = tempfile.mkdtemp(prefix="bench-")
+    results = {}
+    regressions = []
+    print(f"{'case':<28} {'calls':>5} {'p50 ms':>10} {'p99 ms':>10} {'throughput':>22} {'peak RSS':>10}  vs baseline")
+    try:
+        env = case_environment(base_url, scratch, args)
+        for name in args.case or list(CASES):
+            result = results[name] = run_case(name, env)
+            if "error" in result:
+                print(f"{name:<28} ERROR: {' '.join(result['error'])}")
+                continue
+            delta, regressed = compare(name, result, baselines)
+            if regressed:
+                regressions.append(name)
+            print(f"{name:<28} {result['calls']:>5} {result['p50_ms']:>10.1f} {result['p99_ms']:>10.1f} "
+                  f"{result['throughput']:>12.1f} {result['unit']:<9} {result['peak_rss_mb']:>7.0f} MB  {delta}")
+
+        profile = import_profile(IMPORT_PROFILE_MODULES, env)
+        print(f"\n{'import (fresh interpreter)':<28} {'ms':>10}")
+        for module, milliseconds in profile.items():
+            print(f"{module:<28} {'n/a' if milliseconds is None else f'{milliseconds:.1f}':>10}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "llm_latency": args.llm_latency,
+            "download_bytes_per_second": args.download_bytes_per_second,
+        },
+        "results": results,
+        "import_profile_ms": profile,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        report["results"] = dict(baselines.get("results", {}), **results)  # Keep cases that were not re-run
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {BASELINE_PATH}")
+
+    if regressions:
+        print(f"Regressions (> {REGRESSION_THRESHOLD:.0%}): {', '.join(regressions)}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
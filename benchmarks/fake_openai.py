@@ -0,0 +1,123 @@
+# benchmarks/fake_openai.py
+# Local OpenAI-compatible server for benchmarks: python benchmarks/fake_openai.py --port 8999 --latency 0.2
+
+import argparse  # Standalone server options
+import base64  # Embeddings in 'base64' encoding_format
+import hashlib  # Deterministic fake embeddings
+import json  # Request and response bodies
+import random  # Deterministic fake embeddings
+import struct  # Pack float32 embeddings
+import threading  # Serve from a background thread
+import time  # Simulated latency
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Minimal HTTP server
+
+EMBEDDING_DIMENSIONS = 1536  # Same as text-embedding-ada-002
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore".split()
+
+
+# Deterministic unit-free vector for an input (identical input -> identical vector)
+def fake_embedding(value, dimensions=EMBEDDING_DIMENSIONS):
+    rng = random.Random(hashlib.sha256(json.dumps(value).encode("utf-8")).digest())
+    return [rng.gauss(0, 1) for _ in range(dimensions)]
+
+
+# Completion text of 'tokens' words; the first line is a title, like the real chapter answers
+def fake_completion(tokens):
+    words = [WORDS[i % len(WORDS)] for i in range(max(1, tokens))]
+    return "Title: " + " ".join(words[:5]) + "\n" + " ".join(words[5:])
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith("/chat/completions"):
+            self._chat(body)
+        elif self.path.endswith("/embeddings"):
+            self._embeddings(body)
+        else:
+            self.send_error(404)
+
+    def _chat(self, body):
+        server = self.server
+        prompt_tokens = len(json.dumps(body.get("messages", []), ensure_ascii=False)) // 4
+        completion_tokens = min(body.get("max_tokens") or server.completion_tokens, server.completion_tokens)
+        text = fake_completion(completion_tokens)
+        time.sleep(server.latency)
+        header = {"id": "chatcmpl-bench", "created": int(time.time()), "model": body.get("model", "gpt-3.5-turbo")}
+
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for word in text.split(" "):
+                if server.tokens_per_second:
+                    time.sleep(1 / server.tokens_per_second)
+                chunk = dict(header, object="chat.completion.chunk",
+                             choices=[{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}])
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            last = dict(header, object="chat.completion.chunk", choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            self.wfile.write(f"data: {json.dumps(last)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+            self.close_connection = True
+            return
+
+        if server.tokens_per_second:
+            time.sleep(completion_tokens / server.tokens_per_second)
+        self._json(dict(
+            header,
+            object="chat.completion",
+            choices=[{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop", "logprobs": None}],
+            usage={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                   "total_tokens": prompt_tokens + completion_tokens},
+        ))
+
+    def _embeddings(self, body):
+        inputs = body.get("input", [])
+        inputs = inputs if isinstance(inputs, list) and inputs and not isinstance(inputs[0], int) else [inputs]
+        time.sleep(self.server.latency)
+        data = []
+        for i, value in enumerate(inputs):
+            vector = fake_embedding(value)
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        tokens = sum(len(value) if isinstance(value, list) else len(str(value)) // 4 for value in inputs)
+        self._json({"object": "list", "data": data, "model": body.get("model", "text-embedding-ada-002"),
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+    def _json(self, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Start the server in a daemon thread; returns (server, base_url) for OPENAI_BASE_URL
+# 'latency' is added to every request, 'tokens_per_second' (0 = instant) paces completions
+def start_fake_openai(port=0, latency=0.05, tokens_per_second=0, completion_tokens=250):
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.tokens_per_second = tokens_per_second
+    server.completion_tokens = completion_tokens
+    threading.Thread(target=server.serve_forever, daemon=True, name="fake-openai").start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible API for benchmarks.")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every request")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="Completion pacing (0 = instant)")
+    args = parser.parse_args()
+
+    _, base_url = start_fake_openai(args.port, args.latency, args.tokens_per_second)
+    print(f"Fake OpenAI API on {base_url} (set OPENAI_BASE_URL to use it)")
+    threading.Event().wait()
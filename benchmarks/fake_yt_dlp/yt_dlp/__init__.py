@@ -0,0 +1,62 @@
+# benchmarks/fake_yt_dlp/yt_dlp/__init__.py
+# Stand-in for yt_dlp used by the benchmarks (put benchmarks/fake_yt_dlp first on PYTHONPATH)
+# Every video "downloads" the local file FAKE_YTDLP_SOURCE at FAKE_YTDLP_BYTES_PER_SECOND (0 = unthrottled)
+
+import os  # Settings from environment variables, output paths
+import re  # Video IDs from URLs
+import time  # Download throttling
+
+SOURCE = os.getenv("FAKE_YTDLP_SOURCE", "")
+BYTES_PER_SECOND = float(os.getenv("FAKE_YTDLP_BYTES_PER_SECOND", "0"))
+PLAYLIST_SIZE = int(os.getenv("FAKE_YTDLP_PLAYLIST_SIZE", "5"))
+BLOCK_SIZE = 64 * 1024
+
+
+def video_id(url):
+    match = re.search(r"(?:v=|youtu\.be/|shorts/)([\w-]{11})", url)
+    return match.group(1) if match else re.sub(r"\W", "", url)[-11:]
+
+
+# Copy the fixture into 'output' block by block at the configured speed, reporting progress like yt_dlp
+def copy_source(output, progress_hooks=()):
+    total = os.path.getsize(SOURCE)
+    downloaded = 0
+    start = time.monotonic()
+    with open(SOURCE, "rb") as source:
+        for block in iter(lambda: source.read(BLOCK_SIZE), b""):
+            output.write(block)
+            downloaded += len(block)
+            if BYTES_PER_SECOND:
+                delay = downloaded / BYTES_PER_SECOND - (time.monotonic() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            for hook in progress_hooks:
+                hook({"status": "downloading", "downloaded_bytes": downloaded, "total_bytes": total})
+    for hook in progress_hooks:
+        hook({"status": "finished", "downloaded_bytes": downloaded, "total_bytes": total})
+
+
+class YoutubeDL:
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def extract_info(self, url, download=True):
+        if self.params.get("extract_flat"):
+            return {"id": video_id(url), "entries": [{"id": f"fake{i:07d}"} for i in range(PLAYLIST_SIZE)]}
+
+        info = {"id": video_id(url), "ext": os.path.splitext(SOURCE)[1].lstrip(".") or "m4a", "duration": None}
+        if download:
+            path = self.prepare_filename(info)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "wb") as output:
+                copy_source(output, self.params.get("progress_hooks") or [])
+        return info
+
+    def prepare_filename(self, info):
+        return self.params.get("outtmpl", "%(id)s.%(ext)s") % info
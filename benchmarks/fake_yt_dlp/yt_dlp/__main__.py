@@ -0,0 +1,15 @@
+# benchmarks/fake_yt_dlp/yt_dlp/__main__.py
+# Command-line stand-in for 'python -m yt_dlp ... -o - URL' (streaming ingest)
+
+import os  # Output file
+import sys  # Arguments and stdout
+from yt_dlp import copy_source  # Throttled copy of the fixture
+
+args = sys.argv[1:]
+output = args[args.index("-o") + 1] if "-o" in args else "-"
+if output == "-":
+    copy_source(sys.stdout.buffer)
+    sys.stdout.buffer.flush()
+else:
+    with open(os.path.expanduser(output), "wb") as f:
+        copy_source(f)
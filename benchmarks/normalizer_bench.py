@@ -0,0 +1,101 @@
+# benchmarks/normalizer_bench.py
+# Micro-benchmark of the summary/PDF text normalizer against the previous implementation:
+# python benchmarks/normalizer_bench.py [--size-kb 300]
+
+import argparse  # Command-line interface
+import os  # Module path
+import re  # Previous implementation
+import sys  # Module path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Repository root
+
+from bench import measure, summary_fixture  # Shared timing helper and summary fixture
+from text_normalizer import clean_summary, normalize_for_pdf  # Current implementation
+
+
+# ---------------------- Previous implementation (for comparison only) ----------------------
+
+def legacy_clean_text_for_pdf(text):
+    emoji_pattern = re.compile("["
+        "\U0001F600-\U0001F64F"
+        "\U0001F300-\U0001F5FF"
+        "\U0001F680-\U0001F6FF"
+        "\U0001F1E0-\U0001F1FF"
+        "\U00002500-\U00002BEF"
+        "\U00002702-\U000027B0"
+        "\U00002702-\U000027B0"
+        "\U000024C2-\U0001F251"
+        "\U0001f926-\U0001f937"
+        "\U00010000-\U0010ffff"
+        "♀-♂"
+        "☀-⭕"
+        "‍"
+        "⏏"
+        "⏩"
+        "⌚"
+        "️"
+        "〰"
+        "]", flags=re.UNICODE)
+    clean_text = emoji_pattern.sub(r'', text)
+    for symbol, replacement in {
+        "📋": "[Table of Contents]", "✅": "[Done]", "🌍": "[Globe]", "📌": "[Pin]", "🌐": "[Translate]",
+        "🔍": "[Search]", "📄": "[Document]", "📝": "[Notes]", "📁": "[Folder]", "💬": "[Chat]", "🔗": "[Link]",
+        "⚠️": "[Warning]", "🔄": "[Refresh]", "🤖": "[Bot]", "🎮": "[Game]", "🎬": "[Film]", "📂": "[Folder]",
+        "❌": "[Error]",
+    }.items():
+        clean_text = clean_text.replace(symbol, replacement)
+    return re.sub(r'\s+', ' ', clean_text).strip()
+
+
+def legacy_extract_and_clean_summary(summary_html):
+    from bs4 import BeautifulSoup  # Only the previous implementation needs it
+    text = BeautifulSoup(summary_html, "html.parser").get_text(separator="\n")
+    cleaned_lines = []
+    toc_mode = False
+    for line in text.splitlines():
+        if "📋" in line or "Table of Contents" in line:
+            toc_mode = True
+            continue
+        if toc_mode:
+            if line.strip().startswith("✅") or line.strip() == "":
+                continue
+            else:
+                toc_mode = False
+        cleaned_lines.append(line)
+    return "\n".join(cleaned_lines)
+
+
+# Markdown summary of at least 'size_kb' kilobytes (chapters repeated), as emitted by the summarizer
+def large_summary(size_kb):
+    chapter = summary_fixture().replace("<div style='direction: rtl'>", "").replace("</div>", "")
+    return chapter * max(1, size_kb * 1024 // len(chapter.encode("utf-8")) + 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the text normalizer with the previous implementation.")
+    parser.add_argument("--size-kb", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    summary = large_summary(args.size_kb)
+    print(f"Summary size: {len(summary.encode('utf-8')) / 1024:.0f} KB")
+
+    pairs = [("clean_text_for_pdf", legacy_clean_text_for_pdf, normalize_for_pdf)]
+    try:
+        import bs4  # noqa: F401
+        pairs.append(("extract_and_clean_summary", legacy_extract_and_clean_summary, clean_summary))
+    except ImportError:
+        print("beautifulsoup4 is not installed; skipping the extract_and_clean_summary comparison")
+
+    for name, legacy, current in pairs:
+        if legacy(summary) != current(summary):
+            print(f"{name}: outputs differ from the previous implementation")
+        before = measure(lambda: legacy(summary), repeat=args.repeat)
+        after = measure(lambda: current(summary), repeat=args.repeat)
+        print(f"{name:<28} before p50 {before['p50_ms']:8.2f} ms   after p50 {after['p50_ms']:8.2f} ms   "
+              f"speedup {before['p50_ms'] / after['p50_ms']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
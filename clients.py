@@ -0,0 +1,24 @@
+# clients.py
+
+from functools import lru_cache  # Process-wide registry of constructed clients
+
+# The OpenAI and LangChain packages are imported by the first call, not when this module is imported
+
+
+# One OpenAI client per API key, so every call reuses its keep-alive HTTP connection pool
+@lru_cache(maxsize=16)
+def get_openai_client(api_key):
+    from openai import OpenAI  # Raw OpenAI client (summarizer)
+    return OpenAI(api_key=api_key)
+
+
+# One ChatOpenAI model per (key, model, temperature, streaming) combination, shared by all sessions
+@lru_cache(maxsize=64)
+def get_chat_model(api_key, model="gpt-3.5-turbo", temperature=0, streaming=False):
+    from langchain_openai import ChatOpenAI  # OpenAI interface for LangChain
+    return ChatOpenAI(
+        model=model,
+        openai_api_key=api_key,
+        temperature=temperature,
+        streaming=streaming
+    )
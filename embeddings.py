@@ -0,0 +1,50 @@
+# embeddings.py
+
+import os  # Backend selection from environment variables
+import threading  # Guard lazy model loading
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")  # "openai" or "local"
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))  # Texts embedded per forward pass / request
+
+_local_models = {}
+_local_lock = threading.Lock()
+
+
+# Load a sentence-transformers model once per process (optional dependency)
+def _load_local_model(model_name):
+    with _local_lock:
+        if model_name not in _local_models:
+            try:
+                from sentence_transformers import SentenceTransformer  # Only needed for the local backend
+            except ImportError as e:
+                raise ImportError(
+                    "❌ EMBEDDING_BACKEND=local requires the 'sentence-transformers' package (pip install sentence-transformers)."
+                ) from e
+            _local_models[model_name] = SentenceTransformer(model_name, device="cpu")
+        return _local_models[model_name]
+
+
+# Local CPU embeddings with the same interface as LangChain's OpenAIEmbeddings
+class LocalEmbeddings:
+    def __init__(self, model_name=LOCAL_EMBEDDING_MODEL, batch_size=EMBED_BATCH_SIZE):
+        self.model_name = model_name
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts):
+        model = _load_local_model(self.model_name)
+        vectors = model.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+# Return the configured embedding backend and a stable identifier for it (vectors from different models never mix)
+def get_embeddings(openai_api_key=None, backend=None):
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "local":
+        return LocalEmbeddings(), f"local:{LOCAL_EMBEDDING_MODEL}"
+
+    from langchain.embeddings import OpenAIEmbeddings  # Import OpenAI embeddings for text representation
+    return OpenAIEmbeddings(openai_api_key=openai_api_key, chunk_size=EMBED_BATCH_SIZE), "openai:text-embedding-ada-002"
@@ -0,0 +1,372 @@
+# jobs.py
+
+import argparse  # Command-line options for standalone worker processes
+import hashlib  # Deduplication key for identical jobs
+import json  # Job parameters and results are stored as JSON
+import os  # Paths and environment variables
+import sqlite3  # Local persistent job queue
+import threading  # In-process worker threads
+import time  # Timestamps, polling and heartbeats
+import uuid  # Job IDs and claim tokens
+from collections import deque  # Latest transcript lines shown while a job runs
+from contextlib import contextmanager  # Short-lived database connections
+from metrics import span, start_metrics_server  # Queue wait and run time per job kind
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join("cache", "jobs.sqlite"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # Worker threads started inside the web process (0 = external workers only)
+POLL_INTERVAL = 0.5  # Seconds between queue polls
+STALE_SECONDS = 900  # A running job without heartbeat for this long is assumed dead and re-queued
+PARTIAL_INTERVAL = 1.0  # Minimum seconds between partial-transcript writes of a running job
+STREAM_INGEST = os.getenv("STREAM_INGEST", "1") == "1"  # Transcribe links while they download instead of after
+
+# Job states
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+# Raised inside a handler when its job was cancelled
+class JobCancelled(Exception):
+    pass
+
+
+# Raised inside a handler when its job was re-claimed by another worker (this one was too slow to heartbeat)
+class JobSuperseded(Exception):
+    pass
+
+
+_schema_ready = False
+
+
+# Open a connection for one operation (commit on success, always close); safe to use from any thread
+@contextmanager
+def _connect():
+    global _schema_ready
+    os.makedirs(os.path.dirname(JOBS_DB_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        if not _schema_ready:
+            _create_schema(conn)
+            _schema_ready = True
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _create_schema(conn):
+    conn.execute("PRAGMA journal_mode=WAL")  # Pollers never block the workers
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            key TEXT,
+            dedupe TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL,
+            progress REAL NOT NULL DEFAULT 0,
+            message TEXT,
+            partial TEXT,
+            result TEXT,
+            error TEXT,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            created REAL NOT NULL,
+            updated REAL NOT NULL,
+            owner TEXT
+        )"""
+    )
+    try:
+        conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")  # Databases created before claim tokens
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe, status)")
+
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def _dedupe_key(kind, key, params):
+    return hashlib.sha256(json.dumps([kind, key, params], sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+# Queue a job and return its ID; an identical job that is still queued or running is reused instead
+# 'key' is the video hash (transcript cache key) the job belongs to
+def submit_job(kind, key, params):
+    dedupe = _dedupe_key(kind, key, params)
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE dedupe = ? AND status IN (?, ?) ORDER BY created DESC LIMIT 1",
+            (dedupe, QUEUED, RUNNING),
+        ).fetchone()
+        if row is not None:
+            return row["id"]
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn.execute(
+            "INSERT INTO jobs (id, kind, key, dedupe, params, status, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, key, dedupe, json.dumps(params, ensure_ascii=False), QUEUED, now, now),
+        )
+        return job_id
+
+
+def get_job(job_id):
+    with _connect() as conn:
+        return _row_to_job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+
+# Latest successful result of an identical job (same kind, video and parameters), or None
+def latest_result(kind, key, params):
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT result FROM jobs WHERE dedupe = ? AND status = ? ORDER BY updated DESC LIMIT 1",
+            (_dedupe_key(kind, key, params), DONE),
+        ).fetchone()
+    return json.loads(row["result"]) if row and row["result"] else None
+
+
+# Oldest other running job of a kind for the same video (the one a coalesced job is waiting for), or None
+def running_peer(kind, key, job_id):
+    with _connect() as conn:
+        return _row_to_job(conn.execute(
+            "SELECT * FROM jobs WHERE kind = ? AND key = ? AND status = ? AND id != ? ORDER BY created LIMIT 1",
+            (kind, key, RUNNING, job_id),
+        ).fetchone())
+
+
+# Cancel a queued job immediately; a running job stops at its next progress report
+def cancel_job(job_id):
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, updated = ? WHERE id = ? AND status = ?",
+            (CANCELLED, time.time(), job_id, QUEUED),
+        )
+        conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+
+
+# Handle passed to job handlers for progress reporting and cancellation checks
+# 'owner' is the claim token of the worker running the job; only that worker may update or finish it
+class JobContext:
+    def __init__(self, job_id, owner=None):
+        self.job_id = job_id
+        self.owner = owner
+
+    # Store progress (0..1), a status message and optional partial output; raises JobCancelled if requested
+    # and JobSuperseded if another worker has claimed the job in the meantime
+    def report(self, progress=None, message=None, partial=None):
+        with _connect() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET progress = COALESCE(?, progress), message = COALESCE(?, message), "
+                "partial = COALESCE(?, partial), updated = ? WHERE id = ? AND owner IS ?",
+                (progress, message, partial, time.time(), self.job_id, self.owner),
+            ).rowcount
+            cancelled = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (self.job_id,)).fetchone()[0]
+        if not updated:
+            raise JobSuperseded()
+        if cancelled:
+            raise JobCancelled()
+
+    # Placeholder-like object: anything rendered into it becomes the job's partial output
+    def placeholder(self):
+        context = self
+
+        class _Placeholder:
+            def markdown(self, text):
+                context.report(partial=text)
+
+        return _Placeholder()
+
+
+# Registered job handlers: kind -> function(params, context) returning a JSON-serializable result
+HANDLERS = {}
+
+
+def handler(kind):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+# Atomically take the oldest queued (or abandoned) job and stamp it with a new claim token
+def _claim_job():
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")  # Only one worker can claim at a time
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE status = ? OR (status = ? AND updated < ?) ORDER BY created LIMIT 1",
+            (QUEUED, RUNNING, time.time() - STALE_SECONDS),
+        ).fetchone()
+        if row is None:
+            return None
+        owner = uuid.uuid4().hex
+        conn.execute("UPDATE jobs SET status = ?, owner = ?, updated = ? WHERE id = ?", (RUNNING, owner, time.time(), row["id"]))
+        return dict(_row_to_job(row), owner=owner)
+
+
+# Store the outcome, unless another worker has claimed the job since (its result wins)
+def _finish_job(job_id, owner, status, result=None, error=None):
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END, "
+            "result = ?, error = ?, updated = ? WHERE id = ? AND owner IS ?",
+            (status, status, json.dumps(result, ensure_ascii=False) if result is not None else None, error, time.time(),
+             job_id, owner),
+        )
+
+
+# Run a single job to completion (or failure/cancellation)
+def run_job(job):
+    try:
+        with span("job", kind=job["kind"]) as current:
+            current.add(queue_seconds=time.time() - job["created"])
+            result = HANDLERS[job["kind"]](job["params"], JobContext(job["id"], job["owner"]))
+        _finish_job(job["id"], job["owner"], DONE, result=result)
+    except JobSuperseded:
+        pass  # Another worker owns the job now
+    except JobCancelled:
+        _finish_job(job["id"], job["owner"], CANCELLED)
+    except Exception as e:
+        _finish_job(job["id"], job["owner"], FAILED, error=str(e))
+
+
+# Worker loop: claim and run jobs until 'stop' is set
+def work(stop=None):
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        job = _claim_job()
+        if job is None:
+            stop.wait(POLL_INTERVAL)
+            continue
+        run_job(job)
+
+
+_workers_started = False
+_workers_lock = threading.Lock()
+
+
+# Start JOB_WORKERS daemon worker threads in this process (once)
+def start_workers(count=JOB_WORKERS):
+    global _workers_started
+    with _workers_lock:
+        if _workers_started:
+            return
+        for _ in range(count):
+            threading.Thread(target=work, daemon=True, name="job-worker").start()
+        _workers_started = True
+
+
+# ---------------------- Job handlers ----------------------
+# Heavy modules are imported inside the handlers so the queue itself stays cheap to import
+
+# Download (for links) and transcribe media; the transcript is stored in the transcript cache under 'cache_key'
+@handler("transcribe")
+def transcribe_job(params, context):
+    from audio_utils import download_youtube_video, extract_audio, stream_youtube_video
+    from transcript_cache import get_or_transcribe, get_or_transcribe_stream, load_transcript
+
+    video_path = params.get("video_path")
+    cached = load_transcript(params["cache_key"])
+    if cached is not None:
+        return {"cache_key": params["cache_key"], "video_path": video_path, "duration": cached["duration"]}  # Nothing to do
+
+    lines = deque(maxlen=20)  # Only the latest lines are shown
+    last_report = [0.0]
+
+    # At most one write per PARTIAL_INTERVAL, however fast segments are decoded
+    def on_segment(segment):
+        lines.append(f"[{int(segment['start']) // 60:02d}:{int(segment['start']) % 60:02d}] {segment['text']}")
+        if time.monotonic() - last_report[0] >= PARTIAL_INTERVAL:
+            last_report[0] = time.monotonic()
+            context.report(message=f"Transcribed {int(segment['end'])} s of audio", partial="\n".join(lines))
+
+    # Called while another job or process downloads/transcribes this video: show its progress here
+    # (reporting also keeps this job's heartbeat fresh and lets a cancel end the wait)
+    def on_wait():
+        peer = running_peer("transcribe", params["cache_key"], context.job_id)
+        if peer is None:
+            context.report(message="Another worker is processing this video, waiting for its result...")
+        else:
+            context.report(peer["progress"], peer["message"], peer["partial"])
+
+    if not video_path and STREAM_INGEST:
+        # Decode windows as the audio arrives; nothing is written to downloads/
+        context.report(0.1, "Downloading and transcribing...")
+        entry = get_or_transcribe_stream(params["cache_key"], lambda: stream_youtube_video(params["url"]),
+                                         on_segment=on_segment, on_wait=on_wait)
+        return {"cache_key": params["cache_key"], "video_path": None, "duration": entry["duration"]}
+
+    if not video_path:
+        context.report(0.0, "Downloading audio...")
+
+        # Download progress doubles as the job heartbeat (and lets a cancel stop the download)
+        def on_download(status):
+            if status.get("status") == "downloading" and status.get("total_bytes"):
+                context.report(0.1 * status["downloaded_bytes"] / status["total_bytes"])
+
+        video_path = download_youtube_video(params["url"], progress_hook=on_download, on_wait=on_wait)
+    elif not video_path.endswith(".wav"):
+        context.report(0.0, "Extracting audio...")
+        video_path = extract_audio(video_path)  # Demux uploads once as 16 kHz mono WAV
+
+    context.report(0.1, "Transcribing...")
+    entry = get_or_transcribe(params["cache_key"], video_path, on_segment=on_segment, on_wait=on_wait)
+    return {"cache_key": params["cache_key"], "video_path": video_path, "duration": entry["duration"]}
+
+
+# Summarize a cached transcript; chapters appear in 'partial' as they finish
+@handler("summarize")
+def summarize_job(params, context):
+    from summarizer import summarize_text_with_toc_2000
+    from transcriber import join_segments
+    from transcript_cache import load_transcript
+
+    entry = load_transcript(params["cache_key"])
+    if entry is None:
+        raise ValueError("Transcript is no longer cached; please transcribe the video again.")
+
+    summary = summarize_text_with_toc_2000(
+        text=join_segments(entry["segments"]),
+        api_key=os.getenv("OPENAI_API_KEY"),
+        language=params["language"],
+        topic=params["topic"],
+        placeholder=context.placeholder(),
+        segments=entry["segments"],
+        source_url=params.get("source_url"),
+    )
+    return {"summary": summary}
+
+
+# Translate text slice by slice; the translation so far is kept in 'partial'
+@handler("translate")
+def translate_job(params, context):
+    from translator import translate_in_parallel
+
+    translation = ""
+    for i, total, translated in translate_in_parallel(params["text"], params["language"], os.getenv("OPENAI_API_KEY")):
+        translation += translated
+        context.report((i + 1) / total, f"Translated part {i + 1}/{total}", partial=translation)
+    return {"translation": translation.strip()}
+
+
+# Run standalone workers (scaled independently of the web tier): python jobs.py --workers 4
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background job workers.")
+    parser.add_argument("--workers", type=int, default=max(1, JOB_WORKERS))
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv  # Workers need the same environment as the app
+    load_dotenv()
+    start_metrics_server()
+
+    threads = [threading.Thread(target=work, name="job-worker") for _ in range(args.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,162 @@
+# llm_cache.py
+
+import hashlib  # Hash cache keys and input text
+import json  # Serialize key parts deterministically
+import os  # Cache settings from environment variables
+import sqlite3  # On-disk cache backend
+import threading  # Locks for thread-safe backends and counters
+import time  # Entry expiry (TTL)
+from collections import OrderedDict  # LRU ordering for the in-memory backend
+from metrics import span, record, record_usage  # Cache hit and token accounting
+
+# Cache settings (override through environment variables)
+CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "tiered")  # "memory", "sqlite", "tiered" (memory + sqlite) or "none"
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("cache", "llm_cache.sqlite"))
+DEFAULT_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # 7 days
+MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+
+
+# Build a cache key from the model, prompt template version, call parameters and input
+def make_key(model, template_version, params, input_text):
+    input_hash = hashlib.sha256(input_text.encode("utf-8")).hexdigest()
+    key_parts = json.dumps([model, template_version, params, input_hash], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(key_parts.encode("utf-8")).hexdigest()
+
+
+# In-memory LRU backend (per process)
+class MemoryCache:
+    def __init__(self, max_entries=MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)  # Mark as most recently used
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)  # Drop the least recently used entry
+
+
+# On-disk SQLite backend (shared by every process on the node)
+class SQLiteCache:
+    def __init__(self, path=CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")  # Readers do not block the writer
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            self.conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))  # Purge expired rows
+            self.conn.commit()
+
+
+# Cache front-end: looks backends up in order and keeps hit/miss counters
+class LLMCache:
+    def __init__(self, backends, ttl=DEFAULT_TTL):
+        self.backends = backends
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        for i, backend in enumerate(self.backends):
+            value = backend.get(key)
+            if value is not None:
+                for faster in self.backends[:i]:
+                    faster.set(key, value, self.ttl)  # Promote into the faster tiers
+                self._count(hit=True)
+                return value
+        self._count(hit=False)
+        return None
+
+    def set(self, key, value, ttl=None):
+        for backend in self.backends:
+            backend.set(key, value, ttl or self.ttl)
+
+    def _count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    # Return the cached value for the key parts, or compute, store and return it
+    def get_or_compute(self, model, template_version, params, input_text, compute):
+        key = make_key(model, template_version, params, input_text)
+        value = self.get(key)
+        if value is None:
+            record(cache_misses=1)
+            value = compute()
+            self.set(key, value)
+        else:
+            record(cache_hits=1)
+        return value
+
+
+# Process-wide cache, created on first use according to LLM_CACHE_BACKEND
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            if CACHE_BACKEND == "memory":
+                backends = [MemoryCache()]
+            elif CACHE_BACKEND == "sqlite":
+                backends = [SQLiteCache()]
+            elif CACHE_BACKEND == "none":
+                backends = []
+            else:
+                backends = [MemoryCache(), SQLiteCache()]
+            _cache = LLMCache(backends)
+        return _cache
+
+
+# llm.invoke(prompt).content, recording the token usage reported by the model
+def _invoke(llm, prompt):
+    message = llm.invoke(prompt)
+    usage = getattr(message, "usage_metadata", None) or {}
+    record_usage(llm.model_name, usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+    return message.content
+
+
+# Cached equivalent of llm.invoke(prompt).content for LangChain chat models
+def cached_invoke(llm, prompt, template_version):
+    params = {"temperature": llm.temperature}
+    with span("llm", model=llm.model_name, template=template_version):
+        return get_cache().get_or_compute(llm.model_name, template_version, params, prompt, lambda: _invoke(llm, prompt))
@@ -0,0 +1,92 @@
+# matrix_index.py
+
+import json  # Chunk texts and IDs stored next to the matrix
+import os  # Index files on disk
+import shutil  # Delete whole index directories
+import tempfile  # Unique temporary files for atomic writes
+from typing import Any  # Field types for the pydantic-based retriever
+import numpy as np  # Vectorized similarity search
+from langchain_core.documents import Document  # Returned by the retriever
+from langchain_core.retrievers import BaseRetriever  # LangChain retriever interface (.invoke)
+
+INDEX_DIRECTORY = os.getenv("MATRIX_INDEX_DIR", "vectors/")
+SEARCH_BLOCK_ROWS = 8192  # Rows upcast to float32 at a time (BLAS has no float16 kernels)
+
+
+# Write 'path' through a uniquely named temporary file, so concurrent writers never share a partial file
+def _write_atomic(path, mode, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with open(fd, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# In-process exact top-k index: L2-normalized float16 embeddings in a memory-mapped .npy file
+class MatrixIndex:
+    def __init__(self, name, directory=INDEX_DIRECTORY):
+        self.path = os.path.join(directory, name)
+        self.matrix_path = os.path.join(self.path, "embeddings.npy")
+        self.meta_path = os.path.join(self.path, "chunks.json")
+        self.ids = []
+        self.texts = []
+        self.matrix = None
+
+        if os.path.exists(self.matrix_path) and os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.ids, self.texts = meta["ids"], meta["texts"]
+            self.matrix = np.load(self.matrix_path, mmap_mode="r")  # Pages are loaded on demand by the OS
+
+    # Append new (id, text, vector) rows and rewrite the index files atomically
+    def add(self, ids, texts, vectors):
+        if not len(ids):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)  # Cosine similarity = dot product
+        vectors = vectors.astype(np.float16)
+        self.matrix = vectors if self.matrix is None else np.concatenate([np.asarray(self.matrix), vectors])
+        self.ids = self.ids + list(ids)
+        self.texts = self.texts + list(texts)
+
+        os.makedirs(self.path, exist_ok=True)
+        _write_atomic(self.matrix_path, "wb", lambda f: np.save(f, self.matrix))
+        _write_atomic(self.meta_path, "w", lambda f: json.dump({"ids": self.ids, "texts": self.texts}, f, ensure_ascii=False))
+        self.matrix = np.load(self.matrix_path, mmap_mode="r")
+
+    # Return (text, score) pairs for the k rows most similar to the query vector
+    def search(self, query_vector, k=4):
+        if self.matrix is None or not len(self.ids):
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        # Matrix-vector products over bounded float32 blocks keep memory flat for any index size
+        scores = np.concatenate([
+            np.asarray(self.matrix[i:i + SEARCH_BLOCK_ROWS], dtype=np.float32) @ query
+            for i in range(0, len(self.ids), SEARCH_BLOCK_ROWS)
+        ])
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]  # O(n) selection, then sort only the k winners
+        top = top[np.argsort(-scores[top])]
+        return [(self.texts[i], float(scores[i])) for i in top]
+
+    def delete(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+# LangChain retriever over a MatrixIndex, so it can replace the Chroma retriever
+class MatrixRetriever(BaseRetriever):
+    index: Any
+    embeddings: Any
+    k: int = 4
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        query_vector = self.embeddings.embed_query(query)
+        return [
+            Document(page_content=text, metadata={"score": score})
+            for text, score in self.index.search(query_vector, self.k)
+        ]
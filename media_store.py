@@ -0,0 +1,84 @@
+# media_store.py
+# Uploaded and downloaded media on disk: content-addressed uploads and a size-bounded LRU quota over both folders
+
+import hashlib  # Content hash computed while the upload is written
+import os  # File system access and environment variables
+import re  # Safe file extensions
+import shutil  # Remove abandoned partial downloads
+import tempfile  # Write uploads under a temporary name first
+import time  # Access times for LRU eviction
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+DOWNLOAD_DIR = os.getenv("DOWNLOAD_DIR", "downloads")
+MAX_MEDIA_BYTES = int(os.getenv("MEDIA_MAX_BYTES", str(10 * 1024 ** 3)))  # 10 GB over uploads/ and downloads/
+MIN_AGE_SECONDS = float(os.getenv("MEDIA_MIN_AGE", "3600"))  # Media used this recently is never evicted (jobs may be reading it)
+CHUNK_SIZE = 1024 * 1024  # Bytes copied per write
+
+
+# Mark a stored file as recently used; returns False if it no longer exists
+def touch(path):
+    try:
+        os.utime(path)
+        return True
+    except OSError:
+        return False
+
+
+# Stream a file-like upload (e.g. Streamlit's UploadedFile) into UPLOAD_DIR, hashing it while writing
+# Returns (path, cache key); identical content is stored once as uploads/<sha256>.<ext>, whatever the client called it
+def ingest_upload(file, directory=UPLOAD_DIR):
+    os.makedirs(directory, exist_ok=True)
+    extension = re.sub(r"[^a-z0-9]", "", os.path.splitext(getattr(file, "name", ""))[1].lower())[:8]
+    digest = hashlib.sha256()
+
+    file.seek(0)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                f.write(chunk)
+
+        path = os.path.join(directory, f"{digest.hexdigest()}.{extension}" if extension else digest.hexdigest())
+        if touch(path):
+            os.remove(tmp_path)  # Already stored (by this or another session)
+        else:
+            os.replace(tmp_path, path)  # Readers only ever see the complete file
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    enforce_quota()
+    return path, f"sha256-{digest.hexdigest()}"  # Same key as transcript_cache.file_cache_key(path)
+
+
+# Remove least recently used media until uploads/ and downloads/ fit MAX_MEDIA_BYTES
+# Files touched within MIN_AGE_SECONDS are kept even over quota; abandoned partial downloads older than that are removed
+def enforce_quota(max_bytes=MAX_MEDIA_BYTES, directories=(UPLOAD_DIR, DOWNLOAD_DIR)):
+    now = time.time()
+    entries = []
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Removed by another session in the meantime
+            if os.path.isdir(path):
+                if name.startswith(".partial-") and now - stat.st_mtime > MIN_AGE_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)  # Left behind by a crashed download
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, path in sorted(entries):  # Oldest use first
+        if total <= max_bytes or now - mtime < MIN_AGE_SECONDS:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
@@ -0,0 +1,173 @@
+# metrics.py
+
+import contextvars  # Current span per thread / task
+import json  # Structured log lines
+import logging  # Span log output
+import os  # Settings from environment variables
+import sys  # Default log stream
+import threading  # Guard the metric registry and the HTTP server
+import time  # Wall-clock and CPU timers
+from contextlib import contextmanager  # Spans are 'with' blocks
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 disables the /metrics endpoint
+METRICS_LOG = os.getenv("METRICS_LOG", "stderr")  # "stderr", "none" or a file path for JSON span logs
+
+# USD per 1K tokens (prompt, completion); update when pricing changes
+PRICES_PER_1K = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-3.5-turbo-0125": (0.0005, 0.0015),
+    "gpt-4": (0.03, 0.06),
+    "text-embedding-ada-002": (0.0001, 0.0),
+}
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_lock = threading.Lock()
+_counters = {}  # (metric name, labels) -> value
+_histograms = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+logger = logging.getLogger("metrics")
+if METRICS_LOG != "none" and not logger.handlers:
+    handler = logging.FileHandler(METRICS_LOG, encoding="utf-8") if METRICS_LOG != "stderr" else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+server_logger = logging.getLogger("metrics_server")  # Operational messages, kept out of the JSON span log
+
+
+# One measured stage: wall/CPU time plus numeric counters (bytes, audio_seconds, tokens, cache hits...)
+class Span:
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels  # Low-cardinality values (model, template) that become metric labels
+        self.values = {}
+
+    # Add to this span's counters, e.g. span.add(bytes=1024, audio_seconds=60)
+    def add(self, **values):
+        for name, value in values.items():
+            if value:
+                self.values[name] = self.values.get(name, 0) + value
+
+
+# Measure a stage (CPU time is that of the calling thread; worker threads and subprocesses open their own spans)
+# The span is also the target of record() calls made inside the block on the same thread
+@contextmanager
+def span(stage, **labels):
+    current = Span(stage, {name: str(value) for name, value in labels.items()})
+    token = _current_span.set(current)
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    status = "ok"
+    try:
+        yield current
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(current, time.perf_counter() - wall_start, time.thread_time() - cpu_start, status)
+
+
+# Add counters to the innermost open span of this thread (no-op outside a span)
+def record(**values):
+    current = _current_span.get()
+    if current is not None:
+        current.add(**values)
+
+
+# Record token usage (and its cost) of one model call on the current span
+def record_usage(model, prompt_tokens, completion_tokens):
+    prompt_price, completion_price = PRICES_PER_1K.get(model, PRICES_PER_1K.get(model.rsplit("-", 1)[0], (0.0, 0.0)))
+    record(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cost_usd=(prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000,
+    )
+
+
+def _finish(current, wall, cpu, status):
+    labels = tuple(sorted(dict(current.labels, stage=current.stage).items()))
+    with _lock:
+        _inc("stage_calls_total", labels + (("status", status),), 1)
+        _inc("stage_wall_seconds_total", labels, wall)
+        _inc("stage_cpu_seconds_total", labels, cpu)
+        for name, value in current.values.items():
+            _inc(f"stage_{name}_total", labels, value)
+
+        histogram = _histograms.setdefault(labels, [0] * (len(DURATION_BUCKETS) + 2))
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if wall <= bound:
+                histogram[i] += 1
+        histogram[-2] += 1  # +Inf bucket (= count)
+        histogram[-1] += wall
+
+    logger.info(json.dumps(
+        {"ts": time.time(), "stage": current.stage, **current.labels, "status": status,
+         "wall_seconds": round(wall, 4), "cpu_seconds": round(cpu, 4), **current.values},
+        ensure_ascii=False,
+    ))
+
+
+def _inc(name, labels, value):
+    _counters[(name, labels)] = _counters.get((name, labels), 0) + value
+
+
+def _format_labels(labels):
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}" if labels else ""
+
+
+# Current metrics in the Prometheus text exposition format
+def render_metrics():
+    lines = []
+    with _lock:
+        for name in sorted({name for name, _ in _counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(_counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        lines.append("# TYPE stage_duration_seconds histogram")
+        for labels, histogram in sorted(_histograms.items()):
+            for bound, count in zip(DURATION_BUCKETS + ("+Inf",), histogram):
+                lines.append(f"stage_duration_seconds_bucket{_format_labels(labels + (('le', bound),))} {count}")
+            lines.append(f"stage_duration_seconds_count{_format_labels(labels)} {histogram[-2]}")
+            lines.append(f"stage_duration_seconds_sum{_format_labels(labels)} {histogram[-1]:g}")
+    return "\n".join(lines) + "\n"
+
+
+_server_started = False
+_server_lock = threading.Lock()
+
+
+# Serve /metrics on METRICS_PORT from a daemon thread (once per process)
+def start_metrics_server(port=METRICS_PORT):
+    global _server_started
+    with _server_lock:
+        if _server_started or not port:
+            return
+        _server_started = True
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Only processes that serve metrics pay for this import
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render_metrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes are not worth a log line
+
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+        except OSError as e:
+            server_logger.warning("Metrics endpoint not started on port %s: %s", port, e)  # e.g. another process on this node owns it
+            return
+        threading.Thread(target=server.serve_forever, daemon=True, name="metrics-server").start()
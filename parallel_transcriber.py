@@ -0,0 +1,141 @@
+# parallel_transcriber.py
+
+import multiprocessing  # 'spawn' context so worker processes never inherit loaded models
+import os  # Worker count and window size from environment variables
+import threading  # Lock protecting the shared process pool
+from concurrent.futures import ProcessPoolExecutor  # Transcribe audio windows on several cores
+from faster_whisper.audio import decode_audio  # Decode any media file to 16 kHz mono samples
+from faster_whisper.vad import VadOptions, get_speech_timestamps  # Silero VAD to find silence boundaries
+import transcriber  # Shared model pool (one per worker process)
+
+SAMPLING_RATE = 16000  # Whisper works on 16 kHz audio
+
+# Parallel mode settings (0 or 1 worker disables the parallel path)
+PARALLEL_WORKERS = int(os.getenv("WHISPER_PARALLEL_WORKERS", "0"))
+WINDOW_SECONDS = float(os.getenv("WHISPER_WINDOW_SECONDS", "120"))  # Target length of each window
+OVERLAP_SECONDS = float(os.getenv("WHISPER_OVERLAP_SECONDS", "2"))  # Only used when a window must cut through speech
+PAD_SECONDS = 0.2  # Silence kept around each window so words are not clipped
+
+
+# Group VAD speech regions into windows of at most 'max_window' samples, cutting in silence
+# A single speech region longer than a window is cut with 'overlap' samples shared by both sides
+def plan_windows(speech, total_samples, max_window, overlap, pad=0):
+    windows = []
+    win_start = win_end = None
+
+    for region in speech:
+        if win_start is None:
+            win_start, win_end = region["start"], region["end"]
+        elif region["end"] - win_start <= max_window:
+            win_end = region["end"]  # Region still fits in the current window
+        else:
+            windows.append((win_start, win_end))  # Close the window in the silence before this region
+            win_start, win_end = region["start"], region["end"]
+
+        # Force-split speech that runs longer than a window
+        while win_end - win_start > max_window:
+            windows.append((win_start, win_start + max_window))
+            win_start += max_window - overlap
+
+    if win_start is not None:
+        windows.append((win_start, win_end))
+
+    return [(max(0, start - pad), min(total_samples, end + pad)) for start, end in windows]
+
+
+# Initializer for worker processes: split the CPU threads between workers
+def _init_worker(cpu_threads):
+    transcriber.CPU_THREADS = cpu_threads
+    transcriber.POOL_SIZE = 1  # One model per worker process
+
+
+# Transcribe one window of samples (runs inside a worker process)
+def _transcribe_window(audio, model_size, device, compute_type):
+    with transcriber.get_model(model_size, device, compute_type) as model:
+        segments, info = model.transcribe(audio)
+        results = [
+            {"start": segment.start, "end": segment.end, "text": segment.text.strip()}
+            for segment in segments
+        ]
+    return results, info.language
+
+
+# Shared process pool, created on first use and reused so workers keep their models loaded
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers):
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            cpu_threads = max(1, (os.cpu_count() or 1) // workers)
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(cpu_threads,),
+            )
+            _executor_workers = workers
+        return _executor
+
+
+# Shift window-relative segments to global time and drop the ones repeated in overlaps
+def stitch_segments(window_results, last_end=0.0):
+    stitched = []
+    for offset, segments in window_results:
+        for segment in segments:
+            start, end = segment["start"] + offset, segment["end"] + offset
+            if (start + end) / 2 < last_end:
+                continue  # Already covered by the previous window
+            stitched.append({"start": round(start, 3), "end": round(end, 3), "text": segment["text"]})
+            last_end = end
+    return stitched
+
+
+# Transcribe a media file by splitting it into silence-bounded windows and decoding them in parallel
+# Returns the same structure as transcriber.transcribe_segments
+def transcribe_segments_parallel(video_path, on_segment=None, workers=None,
+                                 model_size=transcriber.DEFAULT_MODEL_SIZE,
+                                 device=transcriber.DEFAULT_DEVICE,
+                                 compute_type=transcriber.DEFAULT_COMPUTE_TYPE):
+    workers = workers or PARALLEL_WORKERS or (os.cpu_count() or 1)
+    audio = decode_audio(video_path, sampling_rate=SAMPLING_RATE)
+
+    speech = get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=500), sampling_rate=SAMPLING_RATE)
+    windows = plan_windows(
+        speech,
+        len(audio),
+        int(WINDOW_SECONDS * SAMPLING_RATE),
+        int(OVERLAP_SECONDS * SAMPLING_RATE),
+        int(PAD_SECONDS * SAMPLING_RATE),
+    )
+
+    args = ([audio[start:end] for start, end in windows],
+            [model_size] * len(windows), [device] * len(windows), [compute_type] * len(windows))
+    if workers <= 1 or len(windows) <= 1:
+        results = map(_transcribe_window, *args)  # Not worth starting worker processes
+    else:
+        results = _get_executor(workers).map(_transcribe_window, *args)  # Results come back in window order
+
+    segments = []
+    language = None
+    last_end = 0.0
+    for (start, _), (window_segments, window_language) in zip(windows, results):
+        language = language or window_language
+        new_segments = stitch_segments([(start / SAMPLING_RATE, window_segments)], last_end)
+        for segment in new_segments:
+            segments.append(segment)
+            last_end = segment["end"]
+            if on_segment is not None:
+                on_segment(segment)
+
+    return {
+        "duration": len(audio) / SAMPLING_RATE,
+        "language": language,
+        "model": transcriber.model_settings(model_size, device, compute_type),
+        "segments": segments,
+    }
@@ -0,0 +1,156 @@
+# pdf_utils.py
+
+import copy  # Per-document copies of the parsed font
+import hashlib  # Cache key for rendered PDFs
+import io  # Font file bytes kept in memory
+import logging  # Report export problems
+import os  # Font paths and cache size from the environment
+import re  # Regular expressions for cleaning text (e.g., removing emojis)
+import threading  # Guard the shared PDF cache
+from collections import OrderedDict  # LRU order of cached PDFs
+from functools import lru_cache  # Resolve the font once per process
+from fpdf import FPDF  # Generate PDF files from text
+from fpdf.errors import FPDFException  # Raised when text shaping is unavailable
+from fpdf.fonts import SubsetMap  # Per-document record of the glyphs used
+from fontTools import ttLib  # Font tables (installed with fpdf2)
+from text_normalizer import normalize_for_pdf, clean_summary  # Precompiled single-scan text cleaning
+
+logger = logging.getLogger(__name__)
+
+# ---------------------- Emoji and Symbol Cleaning Function -------------------------
+def clean_text_for_pdf(text):
+    return normalize_for_pdf(text)
+
+# ---------------------- Summary Cleaner: Removes Icons & Structure ----------------------
+def extract_and_clean_summary(summary_html):
+    return clean_summary(summary_html)
+
+# ---------------------- PDF Renderer (in memory, cached) ----------------------
+# Unicode fonts tried in order; DejaVu Sans also covers Arabic (installed by the Dockerfile)
+FONT_CANDIDATES = [
+    os.getenv("PDF_FONT_PATH", ""),
+    "arial-unicode-ms.ttf",
+    "DejaVuSansCondensed.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+]
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # Rendered PDFs kept in memory
+
+ARABIC_CHARS = re.compile("[\u0600-\u06FF\u0750-\u077F\uFB50-\uFDFF\uFE70-\uFEFF]")
+LETTERS = re.compile(r"[^\W\d_]")
+
+_pdf_cache = OrderedDict()  # (text hash, layout) -> PDF bytes, least recently used first
+_pdf_cache_bytes = 0
+_pdf_cache_lock = threading.Lock()
+
+
+# Resolve the Unicode font once per process instead of probing the disk on every render
+@lru_cache(maxsize=1)
+def _font_path():
+    for path in FONT_CANDIDATES:
+        if path and os.path.exists(path):
+            return path
+    raise FileNotFoundError("❌ No Unicode font for PDF export; set PDF_FONT_PATH to a .ttf file (e.g. DejaVuSans.ttf).")
+
+
+# Parse a font once per (path, style): glyph widths, cmap and descriptor are shared by every render
+@lru_cache(maxsize=None)
+def _parsed_font(path, style):
+    pdf = FPDF()
+    pdf.add_font('Unicode', style, path)
+    font, = pdf.fonts.values()
+    font.ttfont.close()  # Each document loads its own font tables (see _add_unicode_font)
+    with open(path, "rb") as f:
+        return font, f.read()
+
+
+# Register the Unicode font on a document without parsing the TTF again
+# Writing the PDF subsets the font tables in place and numbers the descriptor, so those (font tables lazily
+# loaded) and the used-glyph map are per document
+def _add_unicode_font(pdf, style=''):
+    parsed, data = _parsed_font(_font_path(), style)
+    font = copy.copy(parsed)
+    font.i = len(pdf.fonts) + 1
+    font.desc = copy.copy(parsed.desc)
+    font.ttfont = ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False, fontNumber=0, lazy=True)
+    font.subset = SubsetMap(font)
+    font.missing_glyphs = []  # The HarfBuzz font (sized per call) is still created lazily per document
+    pdf.fonts[font.fontkey] = font
+
+
+class SummaryPDF(FPDF):
+    def header(self):
+        self.set_font('Helvetica', 'B', 12)
+        self.cell(0, 10, 'Video Summary Report', 0, 1, 'C')
+        self.ln(10)
+        self.set_font('Unicode', '', self.body_font_size)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Helvetica', 'I', 8)
+        self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
+        self.set_font('Unicode', '', self.body_font_size)
+
+
+# Right-to-left when most letters are Arabic
+def detect_direction(text):
+    letters = len(LETTERS.findall(text))
+    return "rtl" if letters and len(ARABIC_CHARS.findall(text)) / letters > 0.5 else "ltr"
+
+
+def _render(text, font_size, direction):
+    pdf = SummaryPDF()
+    pdf.body_font_size = font_size
+    _add_unicode_font(pdf)
+    pdf.set_font('Unicode', '', font_size)
+    try:
+        # HarfBuzz shaping joins Arabic letters and orders RTL runs ('uharfbuzz' in requirements.txt)
+        pdf.set_text_shaping(use_shaping_engine=True, direction=direction)
+    except FPDFException as e:
+        if direction == "rtl":
+            # Unshaped Arabic comes out as isolated letters in left-to-right order, which is unreadable
+            raise RuntimeError(f"❌ Right-to-left PDF export needs text shaping (pip install uharfbuzz): {e}") from e
+        logger.warning("PDF text shaping unavailable, rendering unshaped text: %s", e)
+    pdf.add_page()
+
+    align = "R" if direction == "rtl" else "L"
+    for line in text.splitlines():  # Keep the summary's line structure (chapters, timestamps)
+        line = clean_text_for_pdf(line)
+        if line:
+            pdf.multi_cell(0, font_size * 0.6, line, align=align, new_x="LMARGIN", new_y="NEXT")
+        else:
+            pdf.ln(font_size * 0.4)
+    return bytes(pdf.output())
+
+
+# Render cleaned summary text to PDF bytes; identical (text, layout) requests are served from memory
+def render_pdf(text, font_size=12, direction=None):
+    global _pdf_cache_bytes
+    direction = direction or detect_direction(text)
+    key = (hashlib.sha256(text.encode("utf-8")).hexdigest(), font_size, direction)
+    with _pdf_cache_lock:
+        if key in _pdf_cache:
+            _pdf_cache.move_to_end(key)
+            return _pdf_cache[key]
+
+    data = _render(text, font_size, direction)
+
+    with _pdf_cache_lock:
+        if key not in _pdf_cache:
+            _pdf_cache[key] = data
+            _pdf_cache_bytes += len(data)
+            while _pdf_cache_bytes > PDF_CACHE_MAX_BYTES and len(_pdf_cache) > 1:
+                _pdf_cache_bytes -= len(_pdf_cache.popitem(last=False)[1])
+    return data
+
+
+# Write the PDF to a file (batch export); returns False on failure
+def create_pdf(text, filename):
+    try:
+        data = render_pdf(text)
+        with open(filename, "wb") as f:
+            f.write(data)
+        return True
+
+    except Exception:
+        logger.exception("Failed to create PDF %s", filename)
+        return False
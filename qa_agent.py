@@ -1,42 +1,45 @@
+import threading  # Guard the shared agent registry
+from collections import OrderedDict  # LRU ordering for cached agents
 from langchain.agents import Tool, AgentType, initialize_agent  # Import LangChain agent-related utilities
-from langchain.chat_models import ChatOpenAI  # Import the chat model interface
 from langsmith import traceable  # Import LangSmith tracking decorator
+from clients import get_chat_model  # Shared chat model (reuses HTTP connections)
 
-# Global variable to hold the transcript content
-global_transcript = ""
+TOP_K = 4  # Number of transcript chunks retrieved per question
+MAX_CACHED_AGENTS = 32  # Agents kept across Streamlit reruns (one per video)
 
-# Function to set the global transcript from outside
-def set_transcript(text):
-    global global_transcript
-    global_transcript = text
+# Built agents keyed by (API key, video key); no module-level transcript shared between users
+_agents = OrderedDict()
+_agents_lock = threading.Lock()
+
+# Return only the transcript chunks most relevant to the question, joined into a compact context
+def retrieve_context(retriever, question, k=TOP_K):
+    docs = retriever.invoke(question)[:k]
+    return "\n\n".join(doc.page_content for doc in docs)
 
 # Decorated agent builder function that LangSmith will track
 @traceable(name="Video Q&A Agent")  # LangSmith will automatically trace this for debugging/analytics
-def build_agent(openai_api_key):  # Function takes in OpenAI API key to authenticate the model
-    if not global_transcript:
+def build_agent(openai_api_key, retriever):  # Takes the OpenAI API key and the retriever of this session's video
+    if retriever is None:
         raise ValueError("❌ No transcript available. Please upload a video and transcribe first.")
 
-    # Internal QA function that searches for the query in the transcript
+    # Internal QA function that looks up the most relevant transcript chunks for the query
     def video_qa_tool(query):
-        if query.lower() not in global_transcript.lower():
+        context = retrieve_context(retriever, query)
+        if not context:
             return "The question is outside the scope of the video."
-        return f"{global_transcript}\n\nAnswer to your question: {query}"
+        return f"Relevant transcript excerpts:\n{context}"
 
     # Define the tool that the agent can use
     tools = [
         Tool(
             name="VideoQA",
             func=video_qa_tool,
-            description="Answers questions strictly from the video transcript."
+            description="Returns the transcript excerpts most relevant to a question about the video."
         )
     ]
 
-    # Initialize the language model
-    llm = ChatOpenAI(
-        model="gpt-4",
-        openai_api_key=openai_api_key,  # Use provided OpenAI key
-        temperature=0  # Make output deterministic
-    )
+    # Shared language model (temperature 0 makes output deterministic)
+    llm = get_chat_model(openai_api_key, model="gpt-4", temperature=0)
 
     # Create the agent using LangChain with the defined tool and model
     agent = initialize_agent(
@@ -46,3 +49,19 @@ def build_agent(openai_api_key):  # Function takes in OpenAI API key to authenti
         verbose=False
     )
     return agent  # Return the constructed agent
+
+# Return the agent for a video, building it only the first time (reruns and other sessions reuse it)
+def get_agent(openai_api_key, retriever, video_key):
+    key = (openai_api_key, video_key)
+    with _agents_lock:
+        agent = _agents.get(key)
+        if agent is not None:
+            _agents.move_to_end(key)
+            return agent
+
+    agent = build_agent(openai_api_key, retriever)
+    with _agents_lock:
+        _agents[key] = agent
+        while len(_agents) > MAX_CACHED_AGENTS:
+            _agents.popitem(last=False)  # Drop the least recently used agent
+    return agent
@@ -0,0 +1,87 @@
+# single_flight.py
+# Cross-process single flight: the first caller for a key does the work, concurrent callers wait and reuse its result
+# Locks are OS file locks, so they are shared by every session, job worker and batch run using the same volume,
+# and the OS releases them when the holder dies (no stale lock files to clean up)
+
+import os  # Lock file paths and environment variables
+import re  # Safe lock file names
+import time  # Lock polling and wait time
+from contextlib import contextmanager  # Lock scope
+from metrics import record  # Wait time and coalesced calls on the current span
+
+try:
+    import fcntl  # POSIX advisory locks (Linux, macOS, the Docker image)
+except ImportError:
+    fcntl = None
+    import msvcrt  # Windows byte-range locks
+
+LOCK_DIR = os.getenv("SINGLE_FLIGHT_DIR", os.path.join("cache", "locks"))
+POLL_INTERVAL = 0.5  # Seconds between lock attempts while 'on_wait' is reporting
+
+
+def _lock_path(key):
+    return os.path.join(LOCK_DIR, re.sub(r"[^\w.-]", "_", key) + ".lock")
+
+
+# Try to take the lock on an open lock file; with blocking=False, return False instead of waiting
+def _acquire(f, blocking):
+    if fcntl:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+    while True:
+        try:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.05)
+
+
+def _release(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# Hold the exclusive lock for 'key'; yields True if another holder had to be waited for
+# 'on_wait' is called every POLL_INTERVAL seconds while waiting (progress, heartbeats, cancellation);
+# without it the call simply blocks. Lock files are tiny and kept, since deleting them would race with waiters
+@contextmanager
+def file_lock(key, on_wait=None):
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    start = time.perf_counter()
+    with open(_lock_path(key), "a+b") as f:
+        waited = not _acquire(f, blocking=False)
+        if waited:
+            if on_wait is None:
+                _acquire(f, blocking=True)
+            else:
+                while True:
+                    on_wait()
+                    time.sleep(POLL_INTERVAL)
+                    if _acquire(f, blocking=False):
+                        break
+            record(lock_wait_seconds=time.perf_counter() - start)
+        try:
+            yield waited
+        finally:
+            _release(f)
+
+
+# Run 'compute' for 'key' while no other process does; 'lookup' is checked again once the lock is held,
+# so callers that queued up behind the leader get its result (None from 'lookup' means "not there yet")
+# Callers are expected to check 'lookup' themselves first, so finished work never touches the lock
+def single_flight(key, lookup, compute, on_wait=None):
+    with file_lock(key, on_wait):
+        result = lookup()
+        if result is not None:
+            record(coalesced=1)
+            return result
+        return compute()
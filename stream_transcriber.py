@@ -0,0 +1,85 @@
+# stream_transcriber.py
+
+from collections import deque  # Windows in flight, in submission order
+from concurrent.futures import Future  # Uniform handling of in-process and worker-process results
+import numpy as np  # Growing buffer of streamed samples
+from faster_whisper.vad import VadOptions, get_speech_timestamps  # Silero VAD to find silence boundaries
+import transcriber  # Default model settings
+from parallel_transcriber import (  # Window planning, stitching and the shared worker pool
+    PAD_SECONDS, OVERLAP_SECONDS, PARALLEL_WORKERS, SAMPLING_RATE, WINDOW_SECONDS,
+    _get_executor, _transcribe_window, plan_windows, stitch_segments,
+)
+
+
+# Transcribe audio while it is still arriving (e.g. from audio_utils.stream_youtube_audio)
+# 'chunks' yields 16 kHz mono float32 arrays; complete silence-bounded windows are decoded as soon as
+# later audio confirms where they end. Returns the same structure as transcriber.transcribe_segments
+def transcribe_stream(chunks, on_segment=None, workers=None,
+                      model_size=transcriber.DEFAULT_MODEL_SIZE,
+                      device=transcriber.DEFAULT_DEVICE,
+                      compute_type=transcriber.DEFAULT_COMPUTE_TYPE):
+    workers = workers or PARALLEL_WORKERS or 1
+    executor = _get_executor(workers) if workers > 1 else None
+    max_window = int(WINDOW_SECONDS * SAMPLING_RATE)
+    overlap = int(OVERLAP_SECONDS * SAMPLING_RATE)
+    pad = int(PAD_SECONDS * SAMPLING_RATE)
+
+    buffer = np.zeros(0, dtype=np.float32)
+    offset = 0  # Stream position (samples) of buffer[0]
+    pending = deque()  # (stream start sample, future) per submitted window
+    segments = []
+    state = {"language": None, "last_end": 0.0}
+
+    def submit(start, audio):
+        if executor is not None:
+            pending.append((start, executor.submit(_transcribe_window, audio, model_size, device, compute_type)))
+        else:
+            future = Future()
+            future.set_result(_transcribe_window(audio, model_size, device, compute_type))
+            pending.append((start, future))
+
+    # Emit finished windows in order; waits while more than 'limit' windows are in flight (backpressure)
+    def drain(limit):
+        while pending and (pending[0][1].done() or len(pending) > limit):
+            start, future = pending.popleft()
+            window_segments, window_language = future.result()
+            state["language"] = state["language"] or window_language
+            for segment in stitch_segments([(start / SAMPLING_RATE, window_segments)], state["last_end"]):
+                segments.append(segment)
+                state["last_end"] = segment["end"]
+                if on_segment is not None:
+                    on_segment(segment)
+
+    # Submit every window of the buffer that is known to be complete and keep the rest
+    def flush(final):
+        nonlocal buffer, offset
+        speech = get_speech_timestamps(buffer, VadOptions(min_silence_duration_ms=500), sampling_rate=SAMPLING_RATE)
+        windows = plan_windows(speech, len(buffer), max_window, overlap, pad)
+        if final:
+            complete, keep_from = windows, len(buffer)
+        elif windows and len(buffer) - windows[-1][0] <= max_window + pad:
+            complete, keep_from = windows[:-1], windows[-1][0]  # The last window may still grow with audio not yet received
+        else:
+            # Only silence after the last window; keep one second in case speech is just starting
+            complete = windows
+            keep_from = max(windows[-1][1] if windows else 0, len(buffer) - SAMPLING_RATE)
+        for start, end in complete:
+            submit(offset + start, buffer[start:end])
+        buffer = buffer[keep_from:]
+        offset += keep_from
+
+    for chunk in chunks:
+        buffer = np.concatenate([buffer, chunk])
+        if len(buffer) >= 2 * max_window:  # Enough audio to close at least one window
+            flush(final=False)
+            drain(limit=workers)
+    if len(buffer):
+        flush(final=True)
+    drain(limit=0)
+
+    return {
+        "duration": (offset + len(buffer)) / SAMPLING_RATE,
+        "language": state["language"],
+        "model": transcriber.model_settings(model_size, device, compute_type),
+        "segments": segments,
+    }
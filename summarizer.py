@@ -1,4 +1,77 @@
-from openai import OpenAI  # Import OpenAI client
+import json  # Serialize chat messages for cache keys
+import logging  # Report inputs sampled down to the cost cap
+import os  # Concurrency settings from environment variables
+import random  # Jitter for retry backoff
+import threading  # Semaphore bounding concurrent API requests
+import time  # Sleep between retries
+from contextlib import nullcontext  # No per-chapter limit by default
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait  # Summarize chapters concurrently
+import tiktoken  # Token counting for budget-based splitting
+from openai import RateLimitError  # OpenAI 429 error
+from clients import get_openai_client  # Shared OpenAI client (keep-alive connection pool)
+from llm_cache import get_cache  # Shared LLM response cache
+from metrics import span, record_usage  # Stage timing and token/cost accounting
+
+logger = logging.getLogger(__name__)
+
+# Prompt template versions (bump when a prompt changes so stale cached responses are not reused)
+CHAPTER_PROMPT_VERSION = "summary-chapter-v1"
+CONDENSE_PROMPT_VERSION = "summary-condense-v1"
+
+SUMMARY_MODEL = "gpt-3.5-turbo-0125"
+MAX_CONCURRENT_REQUESTS = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "5"))  # API requests in flight at once (all levels)
+MAX_RETRIES = int(os.getenv("SUMMARY_MAX_RETRIES", "5"))  # Retries per request on rate limiting
+
+# Map-reduce settings for transcripts longer than one chapter prompt can hold
+CHAPTER_TOKEN_BUDGET = int(os.getenv("SUMMARY_CHAPTER_TOKENS", "3000"))  # Max transcript tokens sent per chapter
+MAP_CHUNK_TOKENS = int(os.getenv("SUMMARY_MAP_CHUNK_TOKENS", "3000"))  # Tokens per map chunk
+MAP_OVERLAP_TOKENS = 100  # Context shared by neighbouring map chunks
+MAX_CHUNKS_PER_LEVEL = int(os.getenv("SUMMARY_MAX_CHUNKS_PER_LEVEL", "40"))  # Cost cap: map requests per level
+MAX_CHUNK_TOKENS = 12000  # Upper bound for a widened map chunk (model context is 16k)
+LEVEL_TIMEOUT = float(os.getenv("SUMMARY_LEVEL_TIMEOUT", "120"))  # Latency cap per level, in seconds
+MAX_LEVELS = 4  # Recursion limit for merging partial summaries
+
+_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+_encoding = None
+
+
+# Tokenizer for the summary model, loaded on first use
+def get_encoding():
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+    return _encoding
+
+
+def count_tokens(text):
+    return len(get_encoding().encode(text))
+
+
+# Split text into chunks of at most 'max_tokens' tokens, sharing 'overlap_tokens' between neighbours
+def split_text_by_tokens(text, max_tokens, overlap_tokens=0):
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    step = max(1, max_tokens - overlap_tokens)
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), step) if i == 0 or i + overlap_tokens < len(tokens)]
+
+
+# Keep 'max_tokens' tokens of text as 'parts' evenly spaced stretches, so the whole span stays represented
+def sample_text_by_tokens(text, max_tokens, parts):
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    block = max(1, max_tokens // parts)
+    stride = len(tokens) / parts
+    return encoding.decode([token for k in range(parts) for token in tokens[int(k * stride):int(k * stride) + block]])
+
+
+# Split text into 'parts' consecutive pieces with (roughly) the same number of tokens
+def split_text_into_parts(text, parts):
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    size = max(1, -(-len(tokens) // parts))  # Ceiling division
+    return [encoding.decode(tokens[i:i + size]) for i in range(0, len(tokens), size)]
 
 # Function to split text into smaller chunks for summarization
 def split_text_for_summary(text, max_chunks=8):
@@ -7,10 +80,182 @@ def split_text_for_summary(text, max_chunks=8):
     chunks = [" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size)]
     return chunks[:max_chunks]  # Return only the desired number of chunks
 
+# Group timestamped transcript segments into 'parts' chapters of roughly equal token count
+# Each chapter keeps the real start/end time (seconds) of its first/last segment
+def split_segments_into_chapters(segments, parts):
+    sizes = [count_tokens(segment["text"]) for segment in segments]
+    target = max(1, -(-sum(sizes) // parts))  # Ceiling division
+
+    chapters = []
+    current = []
+    current_tokens = 0
+    for segment, size in zip(segments, sizes):
+        if current and current_tokens + size > target and len(chapters) < parts - 1:
+            chapters.append(current)
+            current, current_tokens = [], 0
+        current.append(segment)
+        current_tokens += size
+    if current:
+        chapters.append(current)
+
+    return [_chapter(chapter) for chapter in chapters]
+
+
+# Group segments that are still being transcribed into 'parts' chapters of equal duration
+# A chapter is yielded as soon as the first segment past its end arrives, so it can be summarized
+# while the rest of the audio is still being decoded
+def iter_segment_chapters(segments, duration, parts):
+    length = max(duration, 1) / parts
+    boundary = length  # End time of the current chapter
+    current = []
+    for segment in segments:
+        if current and segment["start"] >= boundary and boundary < length * parts:
+            yield _chapter(current)
+            current = []
+            while segment["start"] >= boundary and boundary < length * parts:
+                boundary += length  # Silent stretches can span several chapter lengths
+        current.append(segment)
+    if current:
+        yield _chapter(current)
+
+
+def _chapter(segments):
+    return {
+        "start": segments[0]["start"],
+        "end": segments[-1]["end"],
+        "text": " ".join(segment["text"] for segment in segments),
+    }
+
+
+# Format seconds as MM:SS (or H:MM:SS for long videos)
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+# Link to the source video at a given second (YouTube-style 't' parameter)
+def timestamp_link(source_url, seconds):
+    separator = "&" if "?" in source_url else "?"
+    return f"{source_url}{separator}t={int(seconds)}s"
+
+
+# Call the chat completion API, backing off exponentially when rate limited (HTTP 429)
+def create_completion_with_backoff(client, **kwargs):
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            with _request_slots:  # Shared across chapters and map-reduce levels
+                response = client.chat.completions.create(**kwargs)
+            if response.usage is not None:
+                record_usage(kwargs["model"], response.usage.prompt_tokens, response.usage.completion_tokens)
+            return response
+        except RateLimitError as e:
+            if attempt == MAX_RETRIES:
+                raise
+            retry_after = e.response.headers.get("retry-after") if e.response is not None else None
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = min(30, 2 ** attempt) + random.uniform(0, 1)  # 1s, 2s, 4s ... plus jitter
+            time.sleep(delay)
+
+
+# Cached chat completion: identical model, prompt version, parameters and messages reuse the stored text
+def cached_completion(client, template_version, **kwargs):
+    params = {name: value for name, value in kwargs.items() if name not in ("model", "messages")}
+    with span("llm", model=kwargs["model"], template=template_version):
+        return get_cache().get_or_compute(
+            kwargs["model"],
+            template_version,
+            params,
+            json.dumps(kwargs["messages"], ensure_ascii=False),
+            lambda: create_completion_with_backoff(client, **kwargs).choices[0].message.content,
+        )
+
+
+# Condense one piece of transcript (map step) or a group of partial summaries (reduce step)
+def _condense(client, text, language):
+    instruction = (
+        "لخص النص التالي مع الحفاظ على جميع الأفكار والأسماء والأرقام المهمة بالترتيب:\n\n"
+        if language == "العربية"
+        else "Condense the following text, keeping every important idea, name and number in order:\n\n"
+    )
+    return cached_completion(
+        client,
+        CONDENSE_PROMPT_VERSION,
+        model=SUMMARY_MODEL,
+        messages=[{"role": "user", "content": instruction + text}],
+        temperature=0,
+        max_tokens=500
+    )
+
+
+# Hierarchical map-reduce: condense text in parallel and merge the results until it fits 'token_budget'
+def map_reduce_condense(client, text, language, token_budget=CHAPTER_TOKEN_BUDGET):
+    for level in range(MAX_LEVELS):
+        total_tokens = count_tokens(text)
+        if total_tokens <= token_budget:
+            break
+
+        # Cost cap: widen chunks rather than exceed MAX_CHUNKS_PER_LEVEL requests on this level
+        # Pieces start every (chunk - overlap) tokens, so that step is what bounds the number of pieces
+        step = -(-(total_tokens - MAP_OVERLAP_TOKENS) // MAX_CHUNKS_PER_LEVEL)  # Ceiling division
+        chunk_tokens = max(MAP_CHUNK_TOKENS, step + MAP_OVERLAP_TOKENS)
+        if chunk_tokens > MAX_CHUNK_TOKENS:
+            # Too long even for the widest chunks: condense evenly spaced stretches instead of sending more requests
+            max_tokens = MAX_CHUNKS_PER_LEVEL * (MAX_CHUNK_TOKENS - MAP_OVERLAP_TOKENS) + MAP_OVERLAP_TOKENS
+            logger.warning("Input of %d tokens sampled down to %d to stay within %d map requests",
+                           total_tokens, max_tokens, MAX_CHUNKS_PER_LEVEL)
+            text = sample_text_by_tokens(text, max_tokens, MAX_CHUNKS_PER_LEVEL)
+            chunk_tokens = MAX_CHUNK_TOKENS
+        pieces = split_text_by_tokens(text, chunk_tokens, MAP_OVERLAP_TOKENS)
+
+        # Latency cap: pieces not condensed before LEVEL_TIMEOUT are kept as a truncated excerpt
+        # (only timeouts; API errors such as a bad key or request are raised)
+        executor = ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_REQUESTS, len(pieces))))
+        futures = [executor.submit(_condense, client, piece, language) for piece in pieces]
+        wait(futures, timeout=LEVEL_TIMEOUT)
+        partials = []
+        try:
+            for piece, future in zip(pieces, futures):
+                if not future.done():
+                    future.cancel()
+                    partials.append(split_text_by_tokens(piece, max(1, token_budget // len(pieces)))[0])
+                else:
+                    partials.append(future.result())  # Re-raises the request's error
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        text = "\n\n".join(partials)
+
+    # Hard stop after MAX_LEVELS so a runaway input can never exceed the budget
+    return split_text_by_tokens(text, token_budget)[0] if count_tokens(text) > token_budget else text
+
+
 # Main function to generate summary with table of contents (TOC)
-def summarize_text_with_toc_2000(text, api_key, language="العربية", topic="Detailed Summary", placeholder=None, video_duration_min=7):
-    client = OpenAI(api_key=api_key)  # Initialize OpenAI client with API key
-    chunks = split_text_for_summary(text, max_chunks=5)  # Split text into 5 parts
+# When 'segments' (from the transcriber) are given, chapters carry their real start/end times
+# and, with 'source_url', link back to that moment in the video
+# 'segments' may also be a live iterator (e.g. fed by on_segment during transcription) together with the
+# audio 'duration': chapters are then cut by time and summarized as soon as each one is complete
+# 'chapter_slot' (e.g. a semaphore) is held around each chapter's API calls, not while waiting for chapters
+@span("summarize", model=SUMMARY_MODEL)
+def summarize_text_with_toc_2000(text, api_key, language="العربية", topic="Detailed Summary", placeholder=None, video_duration_min=7,
+                                 segments=None, source_url=None, duration=None, chapter_slot=None):
+    client = get_openai_client(api_key)  # Shared OpenAI client for this API key
+
+    if duration and segments is not None and not isinstance(segments, list):
+        chapters = iter_segment_chapters(segments, duration, 5)  # Lazy: consumed while the transcript grows
+    elif segments:
+        chapters = split_segments_into_chapters(list(segments), 5)  # 5 chapters aligned to segment boundaries
+    else:
+        # Plain text only: split by token count and estimate chapter times from the video duration
+        parts = split_text_into_parts(text, 5)
+        timestamp_interval = max(1, video_duration_min // max(1, len(parts)))
+        chapters = [
+            {"start": i * timestamp_interval * 60, "end": (i + 1) * timestamp_interval * 60, "text": part}
+            for i, part in enumerate(parts)
+        ]
 
     # Define system prompt based on the language
     system_prompt = (
@@ -69,40 +314,61 @@ Text:
     # Select prompt based on language
     user_prompt_template = instruction_ar if language == "العربية" else instruction_en
 
-    # Initialize summary and table of contents
-    full_summary = ""
-    table_of_contents = "📋 **Table of Contents**\n\n"
-    timestamp_interval = max(1, video_duration_min // len(chunks))  # Estimate time for chapters
-
-    # Loop through each text chunk and summarize
-    for i, chunk in enumerate(chunks):
-        timestamp = f"[{int(i * timestamp_interval):02d}:00]"  # e.g., [00:00], [01:00], ...
-        chapter_number = i + 1
+    # Request summary from OpenAI for one chunk (long chapters are map-reduced to fit the budget first)
+    def summarize_chunk(chunk):
+        with chapter_slot or nullcontext():
+            return _summarize_chunk(chunk)
 
-        # Request summary from OpenAI
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo-0125",
+    def _summarize_chunk(chunk):
+        chunk = map_reduce_condense(client, chunk, language)
+        return cached_completion(
+            client,
+            CHAPTER_PROMPT_VERSION,
+            model=SUMMARY_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt_template.format(chunk=chunk)}
             ],
             temperature=0.4,
             max_tokens=300
-        )
+        )  # Response text
+
+    # Build TOC + summary from the chapters finished so far, always in chapter order
+    def render(results):
+        table_of_contents = "📋 **Table of Contents**\n\n"
+        full_summary = ""
+        for i in sorted(results):
+            result = results[i]
+            timestamp = f"[{format_timestamp(chapter_list[i]['start'])}]"  # e.g., [00:00], [03:27], ...
+            chapter_number = i + 1
 
-        result = response.choices[0].message.content  # Extract response text
+            # Extract title from the first line of the result
+            title_line = result.split("\n")[0].strip()
+            title = title_line.replace("عنوان:", "").strip(" :-–").capitalize()
 
-        # Extract title from the first line of the result
-        title_line = result.split("\n")[0].strip()
-        title = title_line.replace("عنوان:", "").strip(" :-–").capitalize()
+            # Add entry to TOC and full summary
+            toc_timestamp = timestamp
+            if source_url:
+                toc_timestamp = f"[{timestamp}]({timestamp_link(source_url, chapter_list[i]['start'])})"  # Seekable link
+            table_of_contents += f"✅ Chapter {chapter_number}: {title} ({toc_timestamp})\n"
+            full_summary += f"{timestamp}\n📌 **{title}**\n{result}\n\n"
+        return table_of_contents + "\n---\n\n" + full_summary
 
-        # Add entry to TOC and full summary
-        table_of_contents += f"✅ Chapter {chapter_number}: {title} ({timestamp})\n"
-        full_summary += f"{timestamp}\n📌 **{title}**\n{result}\n\n"
+    # Summarize all chunks concurrently (bounded by the pool size) and collect results by index
+    # Each chapter is submitted as soon as it exists (immediately for a list, during transcription for a stream)
+    chapter_list = []
+    results = {}
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:  # Threads start only as needed
+        futures = {}
+        for chapter in chapters:
+            chapter_list.append(chapter)
+            futures[executor.submit(summarize_chunk, chapter["text"])] = len(chapter_list) - 1
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
 
-        # Optionally update placeholder (e.g., real-time progress display)
-        if placeholder is not None:
-            placeholder.markdown(table_of_contents + "\n---\n\n" + full_summary)
+            # Optionally update placeholder (e.g., real-time progress display) from the calling thread
+            if placeholder is not None:
+                placeholder.markdown(render(results))
 
     # Return final result: TOC + complete summary
-    return table_of_contents + "\n---\n\n" + full_summary
+    return render(results)
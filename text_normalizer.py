@@ -0,0 +1,51 @@
+# text_normalizer.py
+
+import html  # Decode HTML entities left in summaries
+import re  # Precompiled patterns
+
+# Emoji and pictographic symbols removed from PDF text (compiled once at import)
+# This is the union of the emoji ranges clean_text_for_pdf used to list. The ranges U+24C2..U+1F251 and
+# U+10000..U+10FFFF overlap into one span, so the class is that span plus four lower symbols, and a
+# character is tested against a single range instead of eighteen
+EMOJI_PATTERN = re.compile("[\u200d\u231a\u23cf\u23e9\u24c2-\U0010ffff]+")
+HTML_TAGS = re.compile(r"(?:</?[A-Za-z][^>]*>)+")  # Runs of tags; '<' not followed by a letter is plain text
+
+TOC_MARKERS = ("📋", "Table of Contents")
+TOC_ENTRY = "✅"
+
+
+# Remove emoji and collapse all whitespace to single spaces
+# str.split() with no argument splits on the same whitespace as r"\s+" and drops the ends, in C
+def normalize_for_pdf(text):
+    return " ".join(EMOJI_PATTERN.sub("", text).split())
+
+
+# Turn HTML into text, one line per tag boundary; plain markdown is returned unchanged
+def strip_html(text):
+    if "<" in text:
+        text = HTML_TAGS.sub("\n", text).strip("\n")
+    if "&" in text:
+        text = html.unescape(text)
+    return text
+
+
+# Drop the table of contents (its heading and the ✅ entries and blank lines after it) from a markdown summary
+def strip_toc(text):
+    lines = []
+    toc_mode = False
+    for line in text.splitlines():
+        if TOC_MARKERS[0] in line or TOC_MARKERS[1] in line:
+            toc_mode = True
+            continue
+        if toc_mode:
+            stripped = line.strip()
+            if not stripped or stripped.startswith(TOC_ENTRY):
+                continue
+            toc_mode = False
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# Summary (markdown, possibly wrapped in HTML) -> plain text without the table of contents
+def clean_summary(summary):
+    return strip_toc(strip_html(summary))
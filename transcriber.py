@@ -1,16 +1,160 @@
-from faster_whisper import WhisperModel  # Import the Whisper model from the faster-whisper package
+import os  # Read model pool settings from environment variables
+import queue  # Thread-safe pool of idle model instances
+import threading  # Lock protecting the shared model registry
+import time  # Track when each model was last used
+from contextlib import contextmanager  # Borrow/return models with a 'with' block
+
+# Default model settings (tiny model on CPU with 8-bit precision for low-resource devices)
+DEFAULT_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "tiny")
+DEFAULT_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
+DEFAULT_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+
+# Pool settings shared by every Streamlit session in this process
+CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # 0 lets CTranslate2 pick the thread count
+NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", "1"))  # Parallel decodes allowed inside one model
+POOL_SIZE = int(os.getenv("WHISPER_POOL_SIZE", "2"))  # Max model instances per (size, device, compute_type)
+IDLE_TIMEOUT = float(os.getenv("WHISPER_IDLE_TIMEOUT", "600"))  # Seconds before an unused model is dropped
+
+
+# Bounded pool of loaded models for a single (size, device, compute_type) key
+class _ModelPool:
+    def __init__(self, model_size, device, compute_type):
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.idle = queue.LifoQueue()  # Most recently used model is handed out first (warm caches)
+        self.created = 0  # Number of instances loaded so far
+        self.in_use = 0  # Number of instances currently borrowed
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _load(self):
+        from faster_whisper import WhisperModel  # Heavy (CTranslate2); imported when the first model is loaded
+        return WhisperModel(
+            self.model_size,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=CPU_THREADS,
+            num_workers=NUM_WORKERS,
+        )
+
+    # Count a borrower before it acquires, so the pool is never idle in between (called under _pools_lock)
+    def reserve(self):
+        with self.lock:
+            self.in_use += 1
+
+    def acquire(self):
+        # Reuse an idle instance, load a new one while below the limit, otherwise wait (after reserve())
+        with self.lock:
+            try:
+                return self.idle.get_nowait()
+            except queue.Empty:
+                pass
+            create = self.created < POOL_SIZE
+            if create:
+                self.created += 1
+        if create:
+            try:
+                return self._load()
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+                    self.in_use -= 1
+                raise
+        return self.idle.get()  # Block until another session returns a model
+
+    def release(self, model):
+        with self.lock:
+            self.in_use -= 1
+            self.last_used = time.monotonic()
+        self.idle.put(model)
+
+    def is_idle(self, now):
+        with self.lock:
+            return self.in_use == 0 and now - self.last_used > IDLE_TIMEOUT
+
+
+# Process-wide registry of model pools, created lazily on first use
+_pools = {}
+_pools_lock = threading.Lock()
+_reaper_started = False
+
+
+# Drop pools whose models have not been used for IDLE_TIMEOUT seconds
+def evict_idle_models():
+    now = time.monotonic()
+    with _pools_lock:
+        for key in [key for key, pool in _pools.items() if pool.is_idle(now)]:
+            del _pools[key]  # Models are freed once the last reference goes away
+
+
+# Background thread that frees idle models while the process is idle (not only when the next request arrives)
+def _reap_idle_models():
+    while True:
+        time.sleep(min(60.0, max(1.0, IDLE_TIMEOUT / 2)))
+        evict_idle_models()
+
+
+# Borrow a shared model instance and return it to the pool afterwards
+@contextmanager
+def get_model(model_size=DEFAULT_MODEL_SIZE, device=DEFAULT_DEVICE, compute_type=DEFAULT_COMPUTE_TYPE):
+    global _reaper_started
+    key = (model_size, device, compute_type)
+    with _pools_lock:
+        if not _reaper_started:
+            threading.Thread(target=_reap_idle_models, daemon=True, name="whisper-model-reaper").start()
+            _reaper_started = True
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = _ModelPool(model_size, device, compute_type)
+        pool.reserve()  # The reaper cannot evict the pool between lookup and acquire
+    model = pool.acquire()
+    try:
+        yield model
+    finally:
+        pool.release(model)
+
+
+# Settings that produced a transcript (stored alongside cached transcripts)
+def model_settings(model_size=DEFAULT_MODEL_SIZE, device=DEFAULT_DEVICE, compute_type=DEFAULT_COMPUTE_TYPE):
+    return {"model_size": model_size, "device": device, "compute_type": compute_type}
+
+
+# Generator that yields timestamped segments as Whisper decodes them
+# If an 'info' dict is passed, it is filled with duration/language/model before the first segment
+def iter_segments(video_path, info=None, model_size=DEFAULT_MODEL_SIZE, device=DEFAULT_DEVICE, compute_type=DEFAULT_COMPUTE_TYPE):
+    # The model stays borrowed while the caller consumes the generator
+    with get_model(model_size, device, compute_type) as model:
+        segments, transcription_info = model.transcribe(video_path)  # 'segments' is lazy; decoding happens as we iterate
+
+        if info is not None:
+            info["duration"] = transcription_info.duration  # Audio duration in seconds
+            info["language"] = transcription_info.language
+            info["model"] = model_settings(model_size, device, compute_type)
+
+        for segment in segments:
+            yield {"start": segment.start, "end": segment.end, "text": segment.text.strip()}
+
+
+# Function to transcribe a video/audio file into timestamped segments
+# 'on_segment' is called with each segment as soon as it is decoded (e.g. live UI updates)
+def transcribe_segments(video_path, on_segment=None, model_size=DEFAULT_MODEL_SIZE, device=DEFAULT_DEVICE, compute_type=DEFAULT_COMPUTE_TYPE):
+    info = {}
+    results = []
+    for segment in iter_segments(video_path, info, model_size, device, compute_type):
+        results.append(segment)
+        if on_segment is not None:
+            on_segment(segment)
+
+    return dict(info, segments=results)
+
+
+# Join transcribed segments into a single transcript string
+def join_segments(segments):
+    return " ".join(segment["text"] for segment in segments if segment["text"]).strip()
+
 
 # Function to transcribe a video/audio file using Whisper
-def transcribe_video(video_path):
-    # Load the tiny version of the Whisper model
-    model = WhisperModel("tiny", device="cpu", compute_type="int8")  # Use CPU with 8-bit precision for better performance on low-resource devices
-
-    # Perform transcription
-    segments, info = model.transcribe(video_path)  # 'segments' contains list of transcribed parts; 'info' has metadata
-
-    transcript = ""
-    # Concatenate all segments into a single transcript string
-    for segment in segments:
-        transcript += segment.text + " "
-    
-    return transcript.strip()  # Return final transcript without trailing spaces
+def transcribe_video(video_path, model_size=DEFAULT_MODEL_SIZE, device=DEFAULT_DEVICE, compute_type=DEFAULT_COMPUTE_TYPE):
+    result = transcribe_segments(video_path, model_size=model_size, device=device, compute_type=compute_type)
+    return join_segments(result["segments"])  # Return final transcript without trailing spaces
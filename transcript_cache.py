@@ -0,0 +1,157 @@
+# transcript_cache.py
+
+import hashlib  # Content hashes for uploaded media
+import json  # Cache entries are stored as JSON files
+import os  # File system access and environment variables
+import tempfile  # Write entries atomically through a temporary file
+import time  # Entry timestamps for age-based eviction
+from transcriber import transcribe_segments, model_settings  # Whisper transcription with timestamps
+from metrics import span  # Stage timing
+from single_flight import single_flight  # One transcription per key across sessions and workers
+
+# The parallel and streaming transcribers (faster-whisper VAD, NumPy) are imported on a cache miss only,
+# so cache lookups stay cheap to import
+PARALLEL_WORKERS = int(os.getenv("WHISPER_PARALLEL_WORKERS", "0"))
+
+# Cache location and limits (override through environment variables)
+CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join("cache", "transcripts"))
+MAX_CACHE_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))  # 500 MB
+MAX_AGE_SECONDS = float(os.getenv("TRANSCRIPT_CACHE_MAX_AGE", str(30 * 24 * 3600)))  # 30 days
+
+
+# Hash a media file in fixed-size blocks so large uploads never sit in memory
+def hash_file(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Cache key for an uploaded/local media file (identical content -> identical key)
+def file_cache_key(path):
+    return f"sha256-{hash_file(path)}"
+
+
+# Cache key for a YouTube video, taken from utils.extract_video_id
+def youtube_cache_key(video_id):
+    return f"yt-{video_id}"
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+# Return the cached entry for a key, or None if missing, expired or made with other model settings
+def load_transcript(key, settings=None):
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - entry.get("created", 0) > MAX_AGE_SECONDS:
+        return None
+    if entry.get("model") != (settings or model_settings()):
+        return None
+
+    os.utime(path)  # Mark as recently used for LRU eviction
+    return entry
+
+
+# Store a transcription result under a key, then enforce the size/age limits
+def save_transcript(key, result):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    entry = dict(result, key=key, created=time.time())
+
+    # Write to a temporary file first so readers never see a partial entry
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, _entry_path(key))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    evict_transcripts()
+    return entry
+
+
+# Remove expired entries, then least recently used ones until the cache fits MAX_CACHE_BYTES
+def evict_transcripts():
+    if not os.path.isdir(CACHE_DIR):
+        return
+
+    now = time.time()
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue  # Removed by another session in the meantime
+        if now - stat.st_mtime > MAX_AGE_SECONDS:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # Evicted by another process first
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):  # Oldest access first
+        if total <= MAX_CACHE_BYTES:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+# Return the transcription for a key, transcribing (and caching) only on a miss
+# 'on_segment' receives each freshly decoded segment; it is not called on cache hits
+# Concurrent misses for the same key are coalesced: one caller transcribes, the others wait (calling
+# 'on_wait' every few tenths of a second) and then read its cache entry
+def get_or_transcribe(key, video_path, on_segment=None, on_wait=None, **model_kwargs):
+    settings = model_settings(**model_kwargs)
+    with span("transcribe", model=settings["model_size"], mode="parallel" if PARALLEL_WORKERS > 1 else "file") as current:
+        entry = load_transcript(key, settings)
+        if entry is None:
+            def transcribe():
+                # Split long media across CPU cores when WHISPER_PARALLEL_WORKERS is set
+                transcribe_media = transcribe_segments
+                if PARALLEL_WORKERS > 1:
+                    from parallel_transcriber import transcribe_segments_parallel as transcribe_media
+                result = save_transcript(key, transcribe_media(video_path, on_segment=on_segment, **model_kwargs))
+                current.add(cache_misses=1, audio_seconds=result["duration"], bytes=os.path.getsize(video_path))
+                return result
+
+            entry = single_flight(f"transcribe-{key}", lambda: load_transcript(key, settings), transcribe, on_wait)
+        else:
+            current.add(cache_hits=1)
+    return entry
+
+
+# Like get_or_transcribe, for audio that arrives as a stream of sample chunks
+# 'open_stream' is only called by the caller that transcribes, so cached or in-flight videos are not downloaded again
+def get_or_transcribe_stream(key, open_stream, on_segment=None, on_wait=None, **model_kwargs):
+    settings = model_settings(**model_kwargs)
+    with span("transcribe", model=settings["model_size"], mode="stream") as current:  # Includes the download
+        entry = load_transcript(key, settings)
+        if entry is None:
+            def transcribe():
+                from stream_transcriber import transcribe_stream
+                result = save_transcript(key, transcribe_stream(open_stream(), on_segment=on_segment, **model_kwargs))
+                current.add(cache_misses=1, audio_seconds=result["duration"])
+                return result
+
+            entry = single_flight(f"transcribe-{key}", lambda: load_transcript(key, settings), transcribe, on_wait)
+        else:
+            current.add(cache_hits=1)
+    return entry
@@ -1,18 +1,82 @@
 # 📁 translator.py
 
-from langchain_openai import ChatOpenAI  # Import the OpenAI LLM wrapper from LangChain
+import os  # Concurrency settings from environment variables
+import re  # Sentence boundary detection
+from concurrent.futures import ThreadPoolExecutor  # Translate slices concurrently
+from clients import get_chat_model  # Shared ChatOpenAI models
+from llm_cache import cached_invoke  # Reuse identical translations across reruns
+from metrics import span, record  # Stage timing
+
+TRANSLATE_PROMPT_VERSION = "translate-v2"  # Bump when the prompt below changes
+MAX_SLICE_CHARS = 2000  # Max characters sent per translation request
+MAX_CONCURRENT_TRANSLATIONS = int(os.getenv("TRANSLATE_MAX_CONCURRENCY", "8"))
+
+SENTENCE_END = re.compile(r"(?<=[.!?؟。])\s+")  # Split after sentence-ending punctuation (Latin, Arabic, CJK)
+
 
 # Function to translate a given text to the specified target language
 def translate_summary(text, target_language, api_key):
-    # Initialize the OpenAI language model
-    llm = ChatOpenAI(
-        model="gpt-3.5-turbo",       # Use GPT-3.5-turbo model
-        openai_api_key=api_key,     # Pass the API key for authentication
-        temperature=0               # Set temperature to 0 for deterministic output
-    )
+    # Shared GPT-3.5-turbo model; temperature 0 for deterministic output
+    llm = get_chat_model(api_key, model="gpt-3.5-turbo", temperature=0)
 
     # Create the translation prompt
-    prompt = f"Translate the following text to {target_language}:\n\n{text}"
+    prompt = (
+        f"Translate the following text to {target_language} "
+        f"while preserving all formatting and structure:\n\n{text}"
+    )
+
+    # Invoke the model with the prompt (or reuse a cached answer) and return the translated content
+    with span("translate", language=target_language):
+        record(chars=len(text))
+        return cached_invoke(llm, prompt, TRANSLATE_PROMPT_VERSION)
+
+
+# Split text into slices of at most 'max_chars', cutting at paragraph, then sentence, then word boundaries
+# Returns (slice, separator) pairs; the separator is what originally followed the slice
+def split_for_translation(text, max_chars=MAX_SLICE_CHARS):
+    pieces = []  # (piece, separator) at the finest granularity needed
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append((paragraph, "\n\n"))
+            continue
+        for sentence in SENTENCE_END.split(paragraph):
+            while len(sentence) > max_chars:  # A single huge sentence: cut at the last space that fits
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append((sentence[:cut], " "))
+                sentence = sentence[cut:].lstrip()
+            if sentence:
+                pieces.append((sentence, " "))
+        pieces[-1] = (pieces[-1][0], "\n\n")  # End of paragraph
+
+    # Pack consecutive pieces into slices up to max_chars
+    slices = []
+    current, current_sep = "", ""
+    for piece, sep in pieces:
+        if current and len(current) + len(current_sep) + len(piece) > max_chars:
+            slices.append((current, current_sep))
+            current = ""
+        current = f"{current}{current_sep}{piece}" if current else piece
+        current_sep = sep
+    if current:
+        slices.append((current, current_sep))
+    return slices
+
+
+# Translate long text slice by slice in parallel, yielding (index, total, translated_text) strictly in order
+# Each slice is yielded as soon as it and every slice before it are done
+def translate_in_parallel(text, target_language, api_key, max_workers=MAX_CONCURRENT_TRANSLATIONS):
+    slices = split_for_translation(text)
+    if not slices:
+        return
 
-    # Invoke the model with the prompt and return the translated content
-    return llm.invoke(prompt).content
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(slices))))
+    try:
+        futures = [executor.submit(translate_summary, piece, target_language, api_key) for piece, _ in slices]
+        for i, (future, (_, sep)) in enumerate(zip(futures, slices)):
+            yield i, len(slices), future.result() + sep  # Blocks only on the head-of-line slice
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)  # Stop queued slices if the caller gives up early
@@ -1,23 +1,167 @@
 # vector_store.py
 
+import hashlib  # Content hashes for collection names and chunk IDs
+import json  # Collection last-used registry
+import os  # Paths and environment variables
+import threading  # Guard the shared client and registry
+import time  # Last-used timestamps for LRU garbage collection
+from typing import Any  # Field types for the pydantic-based retriever
+import chromadb  # Persistent Chroma client shared by all collections
+import chromadb.errors  # "Collection does not exist" errors
+from langchain_core.retrievers import BaseRetriever  # LangChain retriever interface (.invoke)
 from langchain_community.vectorstores import Chroma  # Import Chroma vector store (community version)
-from langchain.embeddings import OpenAIEmbeddings    # Import OpenAI embeddings for text representation
-from langchain.schema import Document                # Import Document schema for storing text chunks
-
-# Function to store text chunks in a persistent Chroma vector database
-def store_chunks_persistent(chunks, openai_api_key):
-    # Convert each text chunk into a LangChain Document object
-    docs = [Document(page_content=chunk) for chunk in chunks]
-
-    # Initialize Chroma vector store with OpenAI embeddings
-    vectordb = Chroma.from_documents(
-        docs,
-        embedding=OpenAIEmbeddings(openai_api_key=openai_api_key),  # Use OpenAI to embed each chunk
-        persist_directory="chroma/"  # Path where the vector database will be saved
+from embeddings import EMBED_BATCH_SIZE, get_embeddings  # OpenAI or local CPU embeddings
+from matrix_index import MatrixIndex, MatrixRetriever  # In-process NumPy index
+from metrics import span, record  # Stage timing
+from single_flight import file_lock  # Registry updates from several processes
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")  # "chroma" or "matrix" (memory-mapped NumPy index)
+PERSIST_DIRECTORY = "chroma/"  # Path where the vector database will be saved
+REGISTRY_PATH = os.path.join(PERSIST_DIRECTORY, "collections_lru.json")  # Last use of each collection
+MAX_COLLECTIONS = int(os.getenv("VECTOR_MAX_COLLECTIONS", "50"))  # Older collections are deleted beyond this
+TOUCH_INTERVAL = 60  # Seconds between last-used updates of a collection that is being queried
+
+# Errors meaning a collection was garbage-collected under a live retriever (Chroma renamed the exception across
+# versions; a deleted matrix index shows up as missing files)
+MISSING_COLLECTION_ERRORS = tuple(
+    getattr(chromadb.errors, name) for name in ("InvalidCollectionException", "NotFoundError") if hasattr(chromadb.errors, name)
+) + (FileNotFoundError,)
+
+_client = None
+_lock = threading.RLock()  # Re-entrant: garbage collection uses the client while holding it
+_last_touch = {}  # Collection name -> when this process last recorded its use
+
+
+# Process-wide persistent Chroma client, created on first use
+def get_client():
+    global _client
+    with _lock:
+        if _client is None:
+            _client = chromadb.PersistentClient(path=PERSIST_DIRECTORY)
+        return _client
+
+
+# Collection name for one video (or tenant namespace), derived from its content key
+def collection_name(content_key, namespace="video"):
+    return f"{namespace}-{hashlib.sha256(content_key.encode('utf-8')).hexdigest()[:40]}"
+
+
+def _chunk_id(chunk):
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+def _load_registry():
+    try:
+        with open(REGISTRY_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_registry(registry):
+    os.makedirs(PERSIST_DIRECTORY, exist_ok=True)
+    tmp_path = f"{REGISTRY_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(registry, f)
+    os.replace(tmp_path, REGISTRY_PATH)
+
+
+# Record that a collection was used, then delete the least recently used ones beyond MAX_COLLECTIONS
+# The registry is read, changed and written under a file lock, so processes never lose each other's updates
+def touch_and_collect(name):
+    with _lock, file_lock("vector-registry"):
+        registry = _load_registry()
+        registry[name] = _last_touch[name] = time.time()
+        stale = sorted(registry, key=registry.get)[:max(0, len(registry) - MAX_COLLECTIONS)]
+        for old_name in stale:
+            try:
+                if VECTOR_BACKEND == "matrix":
+                    MatrixIndex(old_name).delete()
+                else:
+                    get_client().delete_collection(old_name)
+            except Exception:
+                pass  # Already deleted (e.g. by another process)
+            del registry[old_name]
+        _save_registry(registry)
+
+
+# Record that a collection was queried (at most every TOUCH_INTERVAL seconds per process),
+# so a video someone is chatting about stays among the most recently used
+def touch(name):
+    if time.time() - _last_touch.get(name, 0) < TOUCH_INTERVAL:
+        return
+    with _lock, file_lock("vector-registry"):
+        registry = _load_registry()
+        registry[name] = _last_touch[name] = time.time()
+        _save_registry(registry)
+
+
+# Retriever for one video's collection: each query counts as a use, and if the collection was
+# garbage-collected anyway (e.g. by another process), it is rebuilt from the chunks and the query retried
+class CollectionRetriever(BaseRetriever):
+    name: str
+    build: Any  # () -> retriever over a (re)indexed collection
+    retriever: Any
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        touch(self.name)
+        try:
+            return self.retriever.invoke(query)
+        except MISSING_COLLECTION_ERRORS:  # Other errors (embedding timeouts, auth...) are the caller's
+            self.retriever = self.build()  # Embeds only the chunks that are missing
+            return self.retriever.invoke(query)
+
+
+# Function to store text chunks in a per-video persistent Chroma collection
+# Chunks already indexed for this video are skipped, so re-running only embeds what is new
+def store_chunks_persistent(chunks, openai_api_key, k=4, content_key=None, namespace="video"):
+    embeddings, embedding_id = get_embeddings(openai_api_key)
+    content_key = content_key or hashlib.sha256("\n".join(chunks).encode("utf-8")).hexdigest()
+    name = collection_name(f"{content_key}:{embedding_id}", namespace)  # Vectors from different models never mix
+
+    def build():
+        return _index(name, chunks, embeddings, k)
+
+    return CollectionRetriever(name=name, build=build, retriever=build())
+
+
+@span("index", backend=VECTOR_BACKEND)
+def _index(name, chunks, embeddings, k):
+    # Content-addressed chunk IDs: identical chunks are embedded once
+    new_chunks = {_chunk_id(chunk): chunk for chunk in chunks}
+
+    if VECTOR_BACKEND == "matrix":
+        # In-process index: embed only the new chunks in batches and append them to the matrix
+        index = MatrixIndex(name)
+        known = set(index.ids)
+        items = [(chunk_id, chunk) for chunk_id, chunk in new_chunks.items() if chunk_id not in known]
+        record(chunks=len(chunks), embedded_chunks=len(items))
+        for i in range(0, len(items), EMBED_BATCH_SIZE):
+            batch = items[i:i + EMBED_BATCH_SIZE]
+            texts = [chunk for _, chunk in batch]
+            index.add([chunk_id for chunk_id, _ in batch], texts, embeddings.embed_documents(texts))
+        touch_and_collect(name)
+        return MatrixRetriever(index=index, embeddings=embeddings, k=k)
+
+    # Open (or create) this video's own Chroma collection
+    vectordb = Chroma(
+        client=get_client(),
+        collection_name=name,
+        embedding_function=embeddings,
     )
 
-    # Save the database to disk
-    vectordb.persist()
+    if new_chunks:
+        existing = set(vectordb.get(ids=list(new_chunks), include=[])["ids"])
+        new_chunks = {chunk_id: chunk for chunk_id, chunk in new_chunks.items() if chunk_id not in existing}
+
+    # Embed and write the remaining chunks in batches (Chroma persists automatically)
+    items = list(new_chunks.items())
+    record(chunks=len(chunks), embedded_chunks=len(items))
+    for i in range(0, len(items), EMBED_BATCH_SIZE):
+        batch = items[i:i + EMBED_BATCH_SIZE]
+        vectordb.add_texts([chunk for _, chunk in batch], ids=[chunk_id for chunk_id, _ in batch])
+
+    touch_and_collect(name)
 
-    # Return a retriever interface for searching similar content later
-    return vectordb.as_retriever()
+    # Return a retriever interface returning the top-k most similar chunks
+    return vectordb.as_retriever(search_kwargs={"k": k})
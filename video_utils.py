@@ -1,17 +1,56 @@
 import cv2  # OpenCV library for video processing
+import numpy as np  # Vectorized frame comparison
 
-# Function to extract all frames from a video file
-def extract_key_frames(video_path):
+SAMPLE_INTERVAL = 1.0  # Seconds between sampled frames
+SCENE_THRESHOLD = 0.2  # Fraction of thumbnail pixels that must change for a new key frame
+PIXEL_DELTA = 25  # Grey-level difference for a thumbnail pixel to count as changed
+THUMB_SIZE = (64, 36)  # Resolution at which frames are compared (width, height)
+SEEK_MIN_FRAMES = 120  # Seek instead of skipping frame by frame when the next sample is this far ahead
+
+
+# Small greyscale copy of a frame used for scene-change detection
+def _thumbnail(frame):
+    small = cv2.resize(frame, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+
+# Generator of (timestamp in seconds, frame) for the frames that start a new scene (slides, diagrams, cuts)
+# Frames are sampled every 'interval' seconds and compared with the last key frame on small thumbnails;
+# only one full-resolution frame is held at a time, so memory does not grow with the video length
+def extract_key_frames(video_path, interval=SAMPLE_INTERVAL, threshold=SCENE_THRESHOLD, max_frames=None, max_width=None):
     cap = cv2.VideoCapture(video_path)  # Open the video file
-    frames = []  # List to store extracted frames
+    if not cap.isOpened():
+        raise ValueError(f"❌ Cannot open video: {video_path}")
+
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        step = max(1, int(round(interval * fps)))  # Frames between samples
+        position = 0  # Frame index of the next sample
+        last_key = None  # Thumbnail of the last yielded frame
+        count = 0
 
-    # Read frames one by one
-    while cap.isOpened():
-        ret, frame = cap.read()  # 'ret' indicates if the frame was read successfully
-        if not ret:
-            break  # Exit loop if no more frames
+        while True:
+            ret, frame = cap.read()  # 'ret' indicates if the frame was read successfully
+            if not ret:
+                break  # End of the video
 
-        frames.append(frame)  # Store the frame in the list
+            thumbnail = _thumbnail(frame)
+            if last_key is None or (np.abs(thumbnail - last_key) > PIXEL_DELTA).mean() >= threshold:
+                if max_width and frame.shape[1] > max_width:
+                    height = round(frame.shape[0] * max_width / frame.shape[1])
+                    frame = cv2.resize(frame, (max_width, height), interpolation=cv2.INTER_AREA)
+                yield position / fps, frame
+                last_key = thumbnail
+                count += 1
+                if max_frames and count >= max_frames:
+                    break
 
-    cap.release()  # Release the video capture object
-    return frames  # Return the list of all frames
+            position += step
+            if step >= SEEK_MIN_FRAMES:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, position)  # Jump ahead; decoding restarts at the nearest I-frame
+            else:
+                for _ in range(step - 1):
+                    if not cap.grab():  # Skip without converting the frame to an image
+                        break
+    finally:
+        cap.release()  # Release the video capture object